@@ -203,12 +203,15 @@ class AnimatingWithForLoop(Scene):
 
 
 class RosePatternNutshell(Scene):
+    num = 7  # intended to be a square
+    offset = 2.3  # controls the spacing between the elements
+
     def construct(self):
         grps = VGroup()  # as there are going to be groups of Texs and RosePatterns
         texs = VGroup()
         patterns = VGroup()
-        num = 7  # intended to be a square
-        offset = 2.3  # controls the spacing between the elements
+        num = self.num
+        offset = self.offset
 
         frame = self.camera.frame
 
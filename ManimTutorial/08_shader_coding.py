@@ -6,6 +6,8 @@ from manim_imports import *
 
 class BlackHole(ShaderScene):
     shader_folder = "black_hole"
+    # `manimgl 08_shader_coding.py BlackHole -w` renders these seconds headless
+    offscreen_time_range = (0, 20)
 
     def construct(self):
         pass
@@ -25,9 +25,9 @@ class LorenzEvolution(InteractiveScene):
         points = array([[x, y, z] for x in ppa for y in ppa for z in ppa])
         particles = DotCloud(points, radius=0.05, color=BLUE)
 
-        particles.add_updater(
-            lambda p, dt: p.set_points(self.update_lorenz(p.get_points(), dt))
-        )
+        # same as update_lorenz, but split across all the cores
+        stepper = ParticleStepper(LorenzSystem(10, 28, 8 / 3))
+        particles.add_updater(lambda p, dt: stepper.step_mobject(p, self.time, dt))
         self.add(particles)
         self.wait(60)
 
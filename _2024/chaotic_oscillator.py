@@ -23,57 +23,6 @@ def get_oscillator_points(
     return pos
 
 
-# from https://github.com/3b1b/videos
-class Spring(VMobject):
-    def __init__(
-        self,
-        mobject: Mobject,
-        base_point,
-        edge=ORIGIN,
-        stroke_color=WHITE,
-        stroke_width=2,
-        twist_rate=8.0,
-        n_twists=8,
-        radius=0.1,
-        lead_length=0.25,
-        **kwargs,
-    ):
-        super().__init__(**kwargs)
-
-        helix = ParametricCurve(
-            lambda t: [
-                radius * math.cos(TAU * t),
-                radius * math.sin(TAU * t),
-                t / twist_rate,
-            ],
-            t_range=(0, n_twists, 0.01),
-        )
-        helix.rotate(PI / 2, UP)
-
-        self.start_new_path(helix.get_start() + lead_length * LEFT)
-        self.add_line_to(helix.get_start())
-        self.append_vectorized_mobject(helix)
-        self.add_line_to(helix.get_end() + lead_length * RIGHT)
-
-        self.set_stroke(color=stroke_color, width=stroke_width)
-        self.set_flat_stroke(False)
-
-        reference_points = self.get_points().copy()
-        width = self.get_width()
-        self.add_updater(lambda m: m.set_points(reference_points))
-        self.add_updater(
-            lambda m: m.stretch(
-                get_norm(base_point - mobject.get_edge_center(edge)) / width, 0
-            )
-        )
-        self.add_updater(
-            lambda m: m.put_start_and_end_on(base_point, mobject.get_edge_center(edge))
-        )
-
-    def get_length(self):
-        return get_norm(self.get_end() - self.get_start())
-
-
 class DuffingOscillator(VGroup):
     def __init__(
         self,
@@ -223,11 +172,9 @@ class EarthTunnel(Scene):
         )
         self.wait()
 
-        earth_cross_section = VGroup(
-            Circle(radius=i, fill_opacity=0, stroke_opacity=1, stroke_width=4)
-            for i in arange(0, radius, 0.005)
+        earth_cross_section = RadialLayers(
+            arange(0, radius, 0.005), colors=(NAVY_BLUE, DARK_BLUE, BLUE)
         )
-        earth_cross_section.set_color_by_gradient(NAVY_BLUE, DARK_BLUE, BLUE)
         self.play(FadeOut(tunnel), FadeOut(ball), Write(earth_cross_section))
         self.remove(earth)
         self.wait()
@@ -303,14 +250,10 @@ class EarthTunnel(Scene):
         self.play(fr.animate.move_to(2 * RIGHT))
         self.wait()
 
-        for layer in earth_cross_section:
-            layer.add_updater(
-                lambda x: (
-                    x.set_opacity(0.005)
-                    if get_norm(ball.get_center()) < x.get_radius()
-                    else x.set_opacity(1)
-                )
-            )
+        # the layers outside of the ball fade
+        earth_cross_section.add_updater(
+            lambda m: m.set_opacity_by_radius(get_norm(ball.get_center()))
+        )
 
         self.play(ShowCreation(circle_outline), ShowCreation(ball))
         self.wait(2)
@@ -437,14 +380,12 @@ class EarthTunnel(Scene):
 
         self.wait_until(lambda: ball.get_y() > radius - 0.1)
 
-        plot = VMobject()
-        plot.set_opacity(0)
         self.delta = axes.c2p(0, 0)[0]
-        plot.start_new_path(array([self.delta, ball.get_y(), 0]))
+        plot = StreamingPlot(array([self.delta, ball.get_y(), 0]))
 
         def update_plot(p, dt):
             self.delta += dt / 2
-            p.add_points_as_corners([array([self.delta, ball.get_y(), 0])])
+            p.add_point(array([self.delta, ball.get_y(), 0]))
 
         plot.add_updater(update_plot)
         plot.set_stroke(color=YELLOW_B, opacity=1)
@@ -455,19 +396,47 @@ class EarthTunnel(Scene):
 
 
 class OscillatorVectorField(Scene):
+    # parameters of the Duffing oscillator (class attributes, so that
+    # render_variants can sweep them)
+    k = -1
+    gamma = 0.1
+    beta = 0.25
+    f0 = 2.5
+    omega = 2
+
     def construct(self):
         fr = self.frame
         fr.set_width(25)
 
-        pts = uniform(-0.01, 0.01, (int(1e6), 3))
+        seed = 0
+        pts = np.random.default_rng(seed).uniform(-0.01, 0.01, (int(1e6), 3))
         pts[:, 2] = 0
         dots = DotCloud(pts).set_color(CYAN)
         dots.set_radius(0.07)
 
-        dots.f_always.set_points(
-            lambda: get_oscillator_points(
-                dots.get_points(), -1, 0.1, 0.25, 2.5, 2, self.time, n_steps=8
-            )
+        # get_oscillator_points(..., n_steps=8): 8 steps of 1 / 60 every frame,
+        # stepped in place. Unlike there, the forcing follows the integrated time
+        # (at each sub step) instead of the time of the scene, so the dots
+        # follow slightly different paths
+        time_scale = 8 * self.camera.fps / 60
+        stepper = ParticleStepper(
+            DuffingSystem(*self.get_duffing_params()),
+            n_substeps=8,
+            time_scale=time_scale,
+        )
+        # x and v are all that change, so only those are cached
+        attach_cached_trajectory(
+            dots,
+            stepper,
+            params=dict(
+                system="duffing", k=self.k, gamma=self.gamma, beta=self.beta,
+                f0=self.f0, omega=self.omega,
+                n_substeps=8, time_scale=time_scale, seed=seed,
+            ),
+            duration=70,
+            get_time=lambda: self.time,
+            axes=(0, 1),
+            fps=self.camera.fps,
         )
 
         field = self.get_field_vector(width=fr.get_width(), height=fr.get_height())
@@ -510,39 +479,28 @@ class OscillatorVectorField(Scene):
         dv = -k * x - gamma * v - beta * x**3 + f0 * cos(omega * self.time)
         return array([dx, dv]).T
 
+    def get_duffing_params(self) -> tuple:
+        return (self.k, self.gamma, self.beta, self.f0, self.omega)
+
     def get_field_vector(
         self,
-        k=-1,
-        gamma=0.1,
-        beta=0.25,
-        f0=2.5,
-        omega=2,
         opacity=0.75,
         width=FRAME_WIDTH,
         height=FRAME_HEIGHT,
     ):
-        return always_redraw(
-            lambda: VectorField(
-                lambda pos: self.get_field(
-                    pos, k=k, gamma=gamma, beta=beta, f0=f0, omega=omega
-                ),
-                Axes(
-                    x_range=(-width / 2, width / 2, 1),
-                    y_range=(-height / 2, height / 2, 1),
-                ),
-                color_map=self.color_func,
-            ).set_stroke(opacity=opacity)
-        )
+        # one field kept in the scene, only its arrows are updated in place
+        return ODEVectorField(
+            DuffingSystem(*self.get_duffing_params()),
+            Axes(
+                x_range=(-width / 2, width / 2, 1),
+                y_range=(-height / 2, height / 2, 1),
+            ),
+            get_time=lambda: self.time,
+            color_map=self.color_func,
+        ).set_stroke(opacity=opacity)
 
-    @staticmethod
-    def color_func(length):
-        length = length.reshape(-1, 1)
-        lmax = np.max(length)
-        lmin = np.min(length)
-        length = (length - lmin) / (lmax - lmin + 1e-8)
-        return np.sqrt(
-            interpolate(color_to_rgb(RED) ** 2, color_to_rgb(DARK_BLUE) ** 2, length)
-        )
+    # RED to DARK_BLUE (interpolated squared), from the shortest to the longest arrow
+    color_func = ColorLUT([RED, DARK_BLUE], normalization="frame")
 
 
 class PhaseSpaceDiagram(OscillatorVectorField):
@@ -587,7 +545,9 @@ class PhaseSpaceDiagram(OscillatorVectorField):
         self.play(Write(dot))
         self.wait(2)
 
-        trail = TracingTail(dot, 7, 4, stroke_opacity=1, stroke_color=YELLOW)
+        trail = RingTrail(
+            dot, 7, 4, stroke_opacity=1, stroke_color=YELLOW, fps=self.camera.fps
+        )
         trail.fix_in_frame()
         self.bring_to_back(trail)
         self.bring_to_back(plane)
@@ -628,23 +588,111 @@ class ChaosWithVectorField(OscillatorVectorField):
         field = self.get_field_vector()
         self.play(ShowCreation(field))
 
-        vals = Tex(r"k = -1, \gamma = 0.1, \beta = 0.25, F_0 = 2.5, \omega = 2")
+        vals = Tex(
+            rf"k = {self.k}, \gamma = {self.gamma}, \beta = {self.beta}, "
+            rf"F_0 = {self.f0}, \omega = {self.omega}"
+        )
         vals.add_background_rectangle(BLACK, opacity=0.75, buff=0.15)
         self.play(ShowCreation(vals))
         self.wait()
         self.play(vals.animate.to_edge(UP, buff=0.35))
 
+        params = self.get_duffing_params()
+        # copies renormalized to stay close to 0.5, for the exponent
+        engine = LyapunovEnsemble(
+            DuffingSystem(*params), 0.5 * RIGHT, n_copies=2000, t0=self.time
+        )
+        # and copies left alone, to see them spread
+        pts = 0.5 * RIGHT + np.random.default_rng(0).uniform(-0.01, 0.01, (2000, 3))
+        pts[:, 2] = 0
+        cloud = DotCloud(pts, radius=0.03).set_color(CYAN).set_opacity(0.5)
+        integrator = BatchedIntegrator(DuffingSystem(*params), "rk4", n_substeps=4)
+
         dot = Dot(0.5 * RIGHT, fill_color=YELLOW)
-        dot2 = Dot(0.51 * RIGHT, fill_color=CYAN)
-        trail = TracingTail(dot, 7, 4, 1, YELLOW)
-        trail2 = TracingTail(dot2, 7, 4, 1, CYAN)
-        self.add(trail, trail2)
-        self.play(ShowCreation(dot), ShowCreation(dot2))
-
-        def update_dots(d):
-            shift = self.get_field(d.get_center(), -1, 0.1, 0.25, 2.5, 2) / 50
-            d.shift(np.hstack((shift[0], array([0]))))
-
-        dot.add_updater(update_dots)
-        dot2.add_updater(update_dots)
+        trail = RingTrail(dot, 7, 4, 1, YELLOW, fps=self.camera.fps)
+        self.add(trail)
+        self.play(ShowCreation(dot), ShowCreation(cloud))
+
+        lyapunov = VGroup(Tex(r"\lambda \approx"), DecimalNumber(0, num_decimal_places=3))
+        divergence = VGroup(Tex(r"\langle \ln(d / d_0) \rangle ="), DecimalNumber(0))
+        for label in (lyapunov, divergence):
+            label.arrange(RIGHT)
+        labels = VGroup(lyapunov, divergence).arrange(DOWN, aligned_edge=LEFT)
+        labels.add_background_rectangle(BLACK, opacity=0.75, buff=0.15)
+        labels.to_corner(DR)
+        lyapunov[1].f_always.set_value(engine.get_lyapunov_exponent)
+        divergence[1].f_always.set_value(engine.get_log_divergence)
+        self.play(FadeIn(labels))
+
+        # the animations above took scene time, start the forcing in phase with the cloud
+        engine.time = self.time
+        dot.add_updater(lambda d, dt: d.move_to(engine.step(dt).get_reference()))
+        cloud.add_updater(lambda c, dt: integrator.step_mobject(c, self.time - dt, dt))
         self.wait(60)
+
+
+class DuffingParameterSweep(Scene):
+    n_oscillators = 1000
+    beta_range = (0, 5)
+
+    def construct(self):
+        n = self.n_oscillators
+        spacing = 0.8 * FRAME_HEIGHT / n
+        ensemble = DuffingEnsemble(
+            n,
+            k=-1,
+            gamma=0.1,
+            beta=np.linspace(*self.beta_range, n),
+            f0=2.5,
+            omega=2,
+            pos=0.5,
+            rest_length=3,
+            side_length=spacing,
+            spacing=spacing,
+            base=3 * LEFT,
+            spring_kwargs=dict(radius=spacing / 3, stroke_width=1),
+        )
+        ensemble.masses.set_fill([CYAN, RED_B])
+
+        top = Tex(rf"\beta = {self.beta_range[0]}").scale(0.75)
+        bottom = Tex(rf"\beta = {self.beta_range[1]}").scale(0.75)
+        top.next_to(ensemble.bases[0], LEFT)
+        bottom.next_to(ensemble.bases[-1], LEFT)
+
+        self.play(FadeIn(ensemble), Write(top), Write(bottom))
+        ensemble.start_simulation()
+        self.wait(30)
+
+
+class DuffingBifurcation(Scene):
+    f0_range = (0.1, 3.0)
+    n_values = 1000
+    n_periods = 1000
+
+    def construct(self):
+        values = np.linspace(*self.f0_range, self.n_values)
+        sections = get_poincare_sections("f0", values, n_periods=self.n_periods)
+
+        axes = Axes(
+            x_range=(*self.f0_range, 0.5),
+            y_range=(-3, 3, 1),
+            width=12,
+            height=6,
+        )
+        labels = axes.get_axis_labels("F_0", "x")
+        diagram = DotCloud(get_bifurcation_points(values, sections, axes), radius=0.005)
+        diagram.set_color(CYAN).set_opacity(0.25)
+
+        self.play(Write(axes), Write(labels))
+        self.play(FadeIn(diagram), run_time=3)
+        self.wait(5)
+
+        # the section at the F0 of the other scenes
+        section = get_poincare_sections("f0", [2.5], n_periods=5 * self.n_periods)
+        plane = NumberPlane(x_range=(-3, 3, 1), y_range=(-3, 3, 1), width=6, height=6)
+        attractor = DotCloud(get_poincare_points(section[0], plane), radius=0.005)
+        attractor.set_color(RED_B).set_opacity(0.5)
+
+        self.play(FadeOut(diagram), FadeOut(labels), ReplacementTransform(axes, plane))
+        self.play(FadeIn(attractor), run_time=3)
+        self.wait(5)
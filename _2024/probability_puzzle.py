@@ -1,5 +1,72 @@
 from manim_imports import *
 
+# compiles every Tex string of the scenes being rendered at the first one,
+# and keeps the svgs across renders
+install_tex_cache(TexCache(prewarm_on_miss=True))
+
+
+class MarblesModel:
+    """
+    State of several sets of marbles at once, one row per set.
+
+    is_red[i, j] tells whether the j-th ball of the i-th set is red, and
+    remaining[i, j] whether it's still in the set (i.e. not drawn yet).
+    Every draw is done for all the sets in one vectorized step.
+    """
+
+    def __init__(self, n_reds, n_balls: int = 100, seed: int = None):
+        # by default, follow the global seed which Scene sets for each render
+        seed = randint(2**32) if seed is None else seed
+        self.rng = np.random.default_rng(seed)
+        n_reds = np.asarray(n_reds).reshape(-1, 1)
+
+        # each row gets its own shuffle of n red balls
+        self.is_red = self.rng.permuted(arange(n_balls) < n_reds, axis=1)
+        self.remaining = np.ones_like(self.is_red)
+
+    @property
+    def n_groups(self) -> int:
+        return self.is_red.shape[0]
+
+    @property
+    def n_balls(self) -> int:
+        return self.is_red.shape[1]
+
+    def get_n_reds(self) -> np.ndarray:
+        return (self.is_red & self.remaining).sum(axis=1)
+
+    def get_n_remaining(self) -> np.ndarray:
+        return self.remaining.sum(axis=1)
+
+    def draw(self, groups: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Draws one ball (without replacement) from each of the selected sets
+        (all by default, otherwise a boolean mask or indices of the sets).
+
+        Returns the indices of the chosen sets, and the drawn balls.
+        """
+        groups = arange(self.n_groups) if groups is None else np.asarray(groups)
+        if groups.dtype == bool:
+            groups = np.flatnonzero(groups)
+
+        # the ball with the smallest random key among the remaining ones
+        keys = self.rng.random((len(groups), self.n_balls))
+        keys[~self.remaining[groups]] = np.inf
+        balls = keys.argmin(axis=1)
+
+        self.remaining[groups, balls] = False
+        return groups, balls
+
+    def draw_is_red(self, groups: np.ndarray = None) -> np.ndarray:
+        """
+        Draws like `draw` and returns a boolean mask over all the sets,
+        true where a red ball was drawn.
+        """
+        groups, balls = self.draw(groups)
+        drawn_red = np.zeros(self.n_groups, dtype=bool)
+        drawn_red[groups] = self.is_red[groups, balls]
+        return drawn_red
+
 
 class Marbles(VGroup):
     def __init__(
@@ -18,19 +85,26 @@ class Marbles(VGroup):
         super().__init__(*dots, **kwargs)
         self.arrange_in_grid(n_rows, n_cols, buff=buff)
         self.pc = primary_color
-        colors = [primary_color] * n + [secondary_color] * (n_rows * n_cols - n)
-        shuffle(colors)
 
-        self.set_color_by_gradient(*colors)
+        self.model = MarblesModel([n], n_rows * n_cols)
+        for dot, is_red in zip(dots, self.model.is_red[0]):
+            dot.is_red = is_red
+
+        self.set_color_by_gradient(
+            *np.where(self.model.is_red[0], primary_color, secondary_color)
+        )
         self.set_n(n)
 
     def set_n(self, n: int):
         self.n = n
         return self
 
+    def get_red_indices(self) -> np.ndarray:
+        return np.flatnonzero([dot.is_red for dot in self.submobjects])
+
     def pick_random_marble(self) -> Dot:
         marble = self.submobjects[randint(len(self.submobjects))]
-        if marble.get_color() == self.pc:
+        if marble.is_red:
             self.set_n(self.get_n() - 1)
         self.remove(marble)
         return marble
@@ -39,6 +113,109 @@ class Marbles(VGroup):
         return self.n
 
 
+class MarblesGrid(DotCloud):
+    """
+    Draws all the sets of a MarblesModel as a single DotCloud, each set
+    being a n_rows x n_cols block, with the blocks arranged in a grid.
+
+    Colors and opacities of all the balls are written in one go by `sync`
+    and `set_group_opacity`, drawn balls being hidden.
+    """
+
+    def __init__(
+        self,
+        model: MarblesModel,
+        n_rows: int = 10,
+        n_cols: int = 10,
+        n_group_cols: int = 17,
+        radius: float = 0.2,
+        group_buff: float = 0.2,
+        primary_color: str = RED_B,
+        secondary_color: str = CYAN,
+        **kwargs,
+    ):
+        self.model = model
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.primary_rgba = color_to_rgba(primary_color)
+        self.secondary_rgba = color_to_rgba(secondary_color)
+
+        # same layout as Marbles(...) arranged with arrange_in_grid
+        spacing = 3 * radius
+        i = arange(model.n_balls)
+        ball_offsets = np.zeros((model.n_balls, 3))
+        ball_offsets[:, 0] = (i % n_cols) * spacing
+        ball_offsets[:, 1] = -(i // n_cols) * spacing
+
+        group_width = (n_cols - 1) * spacing + 2 * radius + group_buff
+        group_height = (n_rows - 1) * spacing + 2 * radius + group_buff
+        g = arange(model.n_groups)
+        group_offsets = np.zeros((model.n_groups, 3))
+        group_offsets[:, 0] = (g % n_group_cols) * group_width
+        group_offsets[:, 1] = -(g // n_group_cols) * group_height
+
+        points = (group_offsets[:, None, :] + ball_offsets[None, :, :]).reshape(-1, 3)
+        super().__init__(points, radius=radius, **kwargs)
+        self.center()
+        self.sync()
+
+    def get_group_rgbas(self) -> np.ndarray:
+        return self.data["rgba"].reshape(self.model.n_groups, self.model.n_balls, 4)
+
+    def get_group_corners(self, groups: np.ndarray) -> np.ndarray:
+        """
+        (lower, upper) corners around the balls of the selected sets,
+        of shape (n, 2, 3), e.g. for FlashAroundGroup.
+        """
+        radius = self.get_radius()
+        points = self.get_points().reshape(self.model.n_groups, self.model.n_balls, 3)
+        points = points[np.asarray(groups)]
+        return np.stack([points.min(axis=1) - radius, points.max(axis=1) + radius], 1)
+
+    def get_group_boxes(self, groups: np.ndarray) -> VGroup:
+        """
+        Invisible rectangles around the selected sets.
+        """
+        boxes = VGroup()
+        for lower, upper in self.get_group_corners(groups):
+            width, height = (upper - lower)[:2]
+            box = Rectangle(width, height, stroke_width=0)
+            boxes.add(box.move_to((lower + upper) / 2))
+        return boxes
+
+    @Mobject.affects_data
+    def set_group_opacity(self, groups: np.ndarray, opacity: float):
+        rgbas = self.get_group_rgbas()
+        rgbas[groups, :, 3] = opacity * self.model.remaining[groups]
+        return self
+
+    def fade_groups(self, groups: np.ndarray, opacity: float, **kwargs):
+        """
+        Animation of set_group_opacity, interpolating only the balls of the
+        selected sets.
+        """
+        groups = np.asarray(groups)
+        if groups.dtype == bool:
+            groups = np.flatnonzero(groups)
+        rows = (groups[:, None] * self.model.n_balls + arange(self.model.n_balls)).ravel()
+        target = opacity * self.model.remaining[groups].ravel()
+        return MaskedDataAnimation(self, rows, target, columns=3, **kwargs)
+
+    @Mobject.affects_data
+    def sync(self):
+        """
+        Writes the colors of all the balls from the model,
+        and hides the ones which are drawn.
+        """
+        model = self.model
+        rgbas = self.get_group_rgbas()
+        rgbas[..., :3] = np.where(
+            model.is_red[..., None], self.primary_rgba[:3], self.secondary_rgba[:3]
+        )
+        rgbas[..., 3] *= model.remaining
+        return self
+
+
 class DescribeProblem(Scene):
     def construct(self):
         marbles = Marbles(radius=0.15, primary_color=WHITE, secondary_color=WHITE)
@@ -164,9 +341,7 @@ class DescribeProblem(Scene):
 class Simulation(Scene):
     def construct(self):
         marbles = Marbles(n=60)
-        pick_color = "CYAN"
-        while pick_color != marbles.pc:
-            pick_color = marbles[n := randint(100)].get_color()
+        n = np.random.choice(marbles.get_red_indices())
 
         marbles.save_state()
         marbles.set_color(WHITE)
@@ -194,14 +369,9 @@ class Simulation(Scene):
         self.wait()
 
     def simulate(self, randomize: bool = False):
-        if randomize:
-            all_marbles = VGroup(Marbles() for _ in range(101))
-        else:
-            all_marbles = VGroup(Marbles(n=i) for i in range(101))
-
-        all_marbles.arrange_in_grid(n_cols=17, buff=0.2)
-        all_marbles.set_width(FRAME_WIDTH / 1.05)
-        all_marbles.arrange_in_grid(n_cols=17, buff=0.2)
+        n_reds = randint(101, size=101) if randomize else arange(101)
+        model = MarblesModel(n_reds)
+        all_marbles = MarblesGrid(model)
         all_marbles.set_width(FRAME_WIDTH / 1.05)
         all_marbles.to_edge(UP, buff=0.75)
 
@@ -214,66 +384,43 @@ class Simulation(Scene):
         red_more.next_to(total_samples, DOWN, buff=0.5)
         red_more.align_to(total_samples, LEFT)
         red_samples_count = red_more.make_number_changeable("50")
-        red_samples_count.set_value(sum(m.n > 50 for m in all_marbles))
+        red_samples_count.set_value((model.get_n_reds() > 50).sum())
 
         self.play(Write(total_samples), Write(red_more))
         self.wait()
 
-        for m in all_marbles:
-            ma = m.pick_random_marble()
-            if ma.get_color() == RED_B:
-                m.fade_it = False
-            else:
-                m.fade_it = True
+        # sets where every ball drawn so far is red
+        is_red = model.draw_is_red()
+        all_marbles.sync()
 
         total_samples_count = total_samples.make_number_changeable("101")
         total_samples_desc = TexText(r"$\rightarrow$ \ the first drawn ball is red.")
         total_samples_desc.next_to(total_samples_count, RIGHT, buff=0.15)
 
+        red_more_mask = is_red & (model.get_n_reds() > model.get_n_remaining() / 2)
         self.play(
-            *[m.animate.set_opacity(0.35) for m in all_marbles if m.fade_it],
+            all_marbles.fade_groups(~is_red, 0.35),
             Write(total_samples_desc),
-            total_samples_count.animate.set_value(
-                (r1 := sum(not m.fade_it for m in all_marbles))
-            ),
-            red_samples_count.animate.set_value(
-                sum(m.n > len(m) / 2 for m in all_marbles if not m.fade_it)
-            ),
+            total_samples_count.animate.set_value((r1 := is_red.sum())),
+            red_samples_count.animate.set_value(red_more_mask.sum()),
         )
         self.wait()
-        all_marbles.save_state()
         self.play(
-            *[
-                FlashAround(m)
-                for m in all_marbles
-                if not m.fade_it and m.n > len(m) / 2
-            ],
+            FlashAroundGroup(all_marbles.get_group_corners(red_more_mask)),
             run_time=5,
         )
         self.wait()
-        self.play(
-            *[
-                m.animate.set_opacity(0.5)
-                for m in all_marbles
-                if not m.fade_it and m.n > len(m) / 2
-            ],
-            run_time=2,
-        )
+        self.play(all_marbles.fade_groups(red_more_mask, 0.5), run_time=2)
         self.wait()
-        self.play(Restore(all_marbles))
+        self.play(all_marbles.fade_groups(red_more_mask, 1))
 
-        for m in all_marbles:
-            if not m.fade_it:
-                ma = m.pick_random_marble()
-                if ma.get_color() == RED_B:
-                    m.fade_it = False
-                else:
-                    m.fade_it = True
+        is_red &= model.draw_is_red(is_red)
+        all_marbles.sync()
 
-        self.play(*[m.animate.set_opacity(0.35) for m in all_marbles if m.fade_it])
+        self.play(all_marbles.fade_groups(~is_red, 0.35))
 
         final_samples_txt = Text(
-            f"Total samples where red second ball is drawn = {(r2:=sum(not m.fade_it for m in all_marbles))}"
+            f"Total samples where red second ball is drawn = {(r2:=is_red.sum())}"
         )
         final_samples_txt.match_y(red_more).align_to(total_samples, LEFT)
         self.play(TransformMatchingTex(red_more, final_samples_txt))
@@ -293,7 +440,16 @@ class Simulation(Scene):
 
 
 class SimulatingGraph(Scene):
+    n_batches = None  # by default, enough for the target width
+    batch_size = 100  # number of trials per batch
+    target_width = 0.01  # width of the confidence interval of the estimate
+    confidence = 0.95
+
     def construct(self):
+        n_batches = self.get_n_batches()
+        exact = get_conditional_probability(n_balls=100)
+        x_step = max(10, 10 * round(n_batches / 100))
+
         # add axes
         txt = Text(
             "Probability of drawing a second red ball\ngiven that first drawn ball is red."
@@ -302,7 +458,7 @@ class SimulatingGraph(Scene):
         txt.shift(0.75 * RIGHT)
 
         axes = Axes(
-            x_range=(0, 1100, 100),
+            x_range=(0, n_batches + x_step, x_step),
             y_range=(0, 1.1, 0.1),
             axis_config=dict(include_tip=True, include_numbers=True),
             y_axis_config=dict(decimal_number_config={"num_decimal_places": 1}),
@@ -312,19 +468,29 @@ class SimulatingGraph(Scene):
         self.play(Write(axes), GrowFromCenter(txt), run_time=2)
         self.wait()
 
-        dot = Dot(axes.c2p(0, 0.67))
-        trail = TracingTail(
-            dot, time_traced=10, stroke_opacity=1, stroke_width=4, stroke_color=CYAN
+        exact_line = DashedLine(axes.c2p(0, exact), axes.c2p(n_batches, exact))
+        exact_line.set_stroke(WHITE, 2, opacity=0.5)
+        self.play(ShowCreation(exact_line))
+
+        dot = Dot(axes.c2p(0, exact))
+        trail = RingTrail(
+            dot,
+            time_traced=10,
+            stroke_opacity=1,
+            stroke_width=4,
+            stroke_color=CYAN,
+            fps=self.camera.fps,
         )
 
         mean, mnum = self.get_number_track("Mean")
         ma, manum = self.get_number_track("Max")
         mi, minum = self.get_number_track("Min")
 
-        stats = []
-        mnum.f_always.set_value(lambda: np.mean(stats) if stats else 0.00)
-        manum.f_always.set_value(lambda: np.max(stats) if stats else 0.00)
-        minum.f_always.set_value(lambda: np.min(stats) if stats else 0.00)
+        simulator = MarblePuzzleSimulator(n_balls=100, batch_size=self.batch_size)
+        stats = RunningStats()
+        mnum.f_always.set_value(stats.get_mean)
+        manum.f_always.set_value(stats.get_max)
+        minum.f_always.set_value(stats.get_min)
 
         stats_tex = VGroup(mean, mi, ma).arrange(RIGHT, buff=1)
         stats_tex.shift(DOWN)
@@ -332,24 +498,26 @@ class SimulatingGraph(Scene):
         self.add(trail)
         self.play(ShowCreation(dot), Write(stats_tex))
 
-        for i in range(1000):
-            balls = array(
-                [shuffled([0] * (100 - i) + [1] * i) for i in randint(101, size=100)]
+        # each step of the dot shows the mean of 10 batches
+        for i in range(0, n_batches, 10):
+            ratios = simulator.run(10)
+            stats.update(ratios)
+            self.play(
+                dot.animate.move_to(axes.c2p(i + 1, ratios.mean())),
+                run_time=0.05,
             )
-            pick1 = balls[:, randint(100, size=balls.shape[0])].diagonal()
-            r1 = pick1.sum()
-
-            sample1 = balls[pick1 == 1]
-            r2 = sample1[:, randint(100, size=r1)].diagonal().sum()
-
-            stats.append(r2 / r1)
-            if not i % 10:
-                self.play(
-                    dot.animate.move_to(axes.c2p(i + 1, np.mean(stats[-10:]))),
-                    run_time=0.05,
-                )
         self.wait()
 
+    def get_n_batches(self) -> int:
+        """
+        Number of batches (a multiple of 10) for the estimate to be within
+        target_width at the given confidence, unless n_batches is set.
+        """
+        if self.n_batches is not None:
+            return self.n_batches
+        n_trials = get_required_trials(self.target_width, self.confidence, n_balls=100)
+        return 10 * math.ceil(n_trials / (10 * self.batch_size))
+
     @staticmethod
     def get_number_track(txt: str):
         tex = TexText(f"{txt}: 0.00")
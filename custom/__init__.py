@@ -1,3 +1,19 @@
 from custom.scene import *
 from custom.constants import *
 from custom.objects import *
+from custom.integrators import *
+from custom.particles import *
+from custom.trajectory_cache import *
+from custom.stats import *
+from custom.marble_puzzle import *
+from custom.vector_fields import *
+from custom.colormaps import *
+from custom.lyapunov import *
+from custom.bifurcation import *
+from custom.variants import *
+from custom.marble_solver import *
+from custom.animations import *
+from custom.tex_cache import *
+from custom.tex_batch import *
+from custom.tex_format import *
+from custom.ensembles import *
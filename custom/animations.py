@@ -0,0 +1,157 @@
+import numpy as np
+from manimlib.animation.animation import Animation
+from manimlib.constants import SMALL_BUFF, YELLOW
+from manimlib.mobject.mobject import Mobject
+from manimlib.mobject.geometry import Rectangle
+from manimlib.mobject.types.vectorized_mobject import VMobject
+
+
+class MaskedDataAnimation(Animation):
+    """
+    Interpolates the rows `mask` (booleans or indices) of one data array of
+    a mobject, e.g. the "rgba" of a DotCloud, from their current values
+    to `target`, as a single animation.
+
+    Instead of copying the whole mobject, only the selected rows are kept when
+    the animation begins, and a frame is one vectorized interpolation into
+    them, however many rows are selected.
+
+    Usage:
+        # fade the first 100 dots
+        self.play(MaskedDataAnimation(dots, np.arange(100), 0.25, columns=3))
+    """
+
+    def __init__(
+        self,
+        mobject: Mobject,
+        mask: np.ndarray,
+        target,
+        key: str = "rgba",
+        columns=slice(None),
+        **kwargs,
+    ):
+        self.mask = np.asarray(mask)
+        self.target = target
+        self.key = key
+        self.columns = columns
+        super().__init__(mobject, **kwargs)
+
+    def create_starting_mobject(self) -> Mobject:
+        # the starting values of the selected rows are all that's kept
+        return self.mobject
+
+    def begin(self) -> None:
+        rows = self.mask
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        self.rows = rows
+
+        # fancy indexing, so these are copies
+        self.start_values = self.mobject.data[self.key][rows, self.columns]
+        target = np.broadcast_to(self.target, self.start_values.shape)
+        self.deltas = target - self.start_values
+        self.values = np.zeros_like(self.start_values)
+        super().begin()
+
+    def interpolate_mobject(self, alpha: float) -> None:
+        alpha = self.rate_func(self.time_spanned_alpha(alpha))
+        np.multiply(self.deltas, alpha, out=self.values)
+        np.add(self.values, self.start_values, out=self.values)
+        self.mobject.data[self.key][self.rows, self.columns] = self.values
+        self.mobject.note_changed_data()
+
+
+def get_bounding_corners(mobjects) -> np.ndarray:
+    """
+    (lower, upper) corners of the bounding box of every mobject, shape (n, 2, 3).
+    """
+    corners = [mob.get_bounding_box()[[0, 2]] for mob in mobjects]
+    return np.array(corners).reshape(-1, 2, 3)
+
+
+class FlashAroundGroup(Animation):
+    """
+    Same as playing a FlashAround for each of many targets, but drawn as a
+    single VMobject and animated by one write of the stroke widths per frame.
+
+    `targets` is a group of mobjects, or an array of (lower, upper) corners
+    of boxes of shape (n, 2, 3). Every rectangle is a scaled copy of the
+    same template, so all of them share one profile of widths.
+    """
+
+    def __init__(
+        self,
+        targets,
+        time_width: float = 1.0,
+        taper_width: float = 0.0,
+        stroke_width: float = 4.0,
+        color=YELLOW,
+        buff: float = SMALL_BUFF,
+        n_inserted_curves: int = 100,
+        remover: bool = True,
+        **kwargs,
+    ):
+        self.time_width = time_width
+
+        if isinstance(targets, Mobject):
+            corners = get_bounding_corners(targets.submobjects)
+        else:
+            corners = np.asarray(targets, dtype=float).reshape(-1, 2, 3)
+        self.n_boxes = len(corners)
+
+        template = Rectangle(1, 1)
+        template.insert_n_curves(n_inserted_curves)
+        template = template.get_points_without_null_curves()
+        self.block_size = len(template) + 1
+
+        # every rectangle, followed by a handle on its end separating it from the next
+        sizes = corners[:, 1] - corners[:, 0] + 2 * buff
+        sizes[:, 2] = 1
+        centers = corners.mean(axis=1)
+        blocks = np.vstack([template, template[-1:]])
+        points = blocks[np.newaxis] * sizes[:, np.newaxis] + centers[:, np.newaxis]
+
+        path = VMobject()
+        path.set_points(points.reshape(-1, 3)[:-1])
+        path.set_stroke(color, 0)
+        if isinstance(targets, Mobject) and targets.is_fixed_in_frame():
+            path.fix_in_frame()
+
+        # tapered widths along one rectangle, as in VShowPassingFlash
+        self.xs = np.linspace(0, 1, len(template))
+        taper = np.where(
+            self.xs < taper_width,
+            self.xs,
+            np.where(self.xs > 1 - taper_width, 1 - self.xs, 1),
+        )
+        self.template_widths = stroke_width * taper
+        self.widths = np.zeros(self.block_size)
+
+        super().__init__(path, remover=remover, **kwargs)
+
+    def create_starting_mobject(self) -> Mobject:
+        return self.mobject
+
+    def interpolate_mobject(self, alpha: float) -> None:
+        if self.n_boxes == 0:
+            return
+        alpha = self.rate_func(self.time_spanned_alpha(alpha))
+
+        # a gaussian whose 3 sigmas on either side equal time_width
+        tw = self.time_width
+        sigma = tw / 6
+        mu = (1 - alpha) * (-tw / 2) + alpha * (1 + tw / 2)
+        widths = self.widths[:-1]
+        np.subtract(self.xs, mu, out=widths)
+        widths[np.abs(widths) > 3 * sigma] = np.inf
+        np.divide(widths, sigma, out=widths)
+        np.square(widths, out=widths)
+        np.multiply(widths, -0.5, out=widths)
+        np.exp(widths, out=widths)
+        np.multiply(widths, self.template_widths, out=widths)
+
+        stroke_widths = self.mobject.data["stroke_width"][:, 0]
+        n_full = (self.n_boxes - 1) * self.block_size
+        stroke_widths[:n_full].reshape(-1, self.block_size)[:] = self.widths
+        stroke_widths[n_full:] = widths
+        self.mobject.note_changed_data()
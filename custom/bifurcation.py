@@ -0,0 +1,175 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from manimlib.constants import TAU
+from manimlib.logger import log
+from manimlib.utils.directories import get_cache_dir
+from custom.integrators import DuffingSystem, BatchedIntegrator
+from custom.trajectory_cache import TrajectoryCache
+
+
+# the forced Duffing oscillator of the chaotic_oscillator scenes
+DUFFING_PARAMS = dict(k=-1, gamma=0.1, beta=0.25, f0=2.5, omega=2)
+
+
+def compute_poincare_sections(
+    params: dict,
+    initial_states: np.ndarray,
+    n_periods: int,
+    n_transient: int,
+    steps_per_period: int,
+    phase: float = 0.0,
+) -> np.ndarray:
+    """
+    Samples (x, v) of the forced Duffing oscillator once per forcing period,
+    at the given phase of the forcing, for every combination of parameters
+    (numbers or arrays of n_values values in `params`) and initial state.
+
+    Every oscillator is stepped with RK4 and its own step size (a fraction of
+    its own period), all of them at once by a BatchedIntegrator. The first
+    `n_transient` periods are thrown away. Returns an array of shape
+    (n_values, len(initial_states) * n_periods, 2).
+    """
+    names = ("k", "gamma", "beta", "f0", "omega")
+    n_values = max(np.size(params[name]) for name in names)
+    initial_states = np.array(initial_states, dtype=float).reshape(-1, 2)
+    n_initial = len(initial_states)
+    batch = n_values * n_initial
+
+    system = DuffingSystem(*(
+        np.repeat(np.broadcast_to(params[name], n_values), n_initial).astype(float)
+        for name in names
+    ))
+    integrator = BatchedIntegrator(system, method="rk4")
+
+    state = np.zeros((batch, 3))
+    state[:, :2] = np.tile(initial_states, (n_values, 1))
+
+    # every oscillator has its own period, and time
+    t0 = phase / system.omega
+    period_times = TAU / system.omega
+    t = np.zeros(batch)
+
+    samples = np.zeros((batch, n_periods, 2))
+    for period in range(n_transient + n_periods):
+        np.multiply(period_times, period, out=t)
+        np.add(t, t0, out=t)
+        integrator.step(state, t, period_times, n_steps=steps_per_period)
+
+        if period >= n_transient:
+            samples[:, period - n_transient] = state[:, :2]
+
+    return samples.reshape(n_values, n_initial * n_periods, 2)
+
+
+def get_poincare_sections(
+    parameter: str = "f0",
+    values=None,
+    n_periods: int = 1000,
+    n_transient: int = 200,
+    steps_per_period: int = 100,
+    initial_states=((0.5, 0),),
+    phase: float = 0.0,
+    params: dict = None,
+    n_workers: int = None,
+    chunk_size: int = None,
+    cache: TrajectoryCache = None,
+) -> np.ndarray:
+    """
+    Stroboscopic Poincaré sections of the forced Duffing oscillator for every
+    value of `parameter` (one of k, gamma, beta, f0 or omega) in `values`,
+    the other parameters being taken from `params` (DUFFING_PARAMS by default).
+
+    The values are split into chunks computed on a pool of `n_workers`
+    processes (one chunk per process by default, since a step costs about
+    the same for a few values as for a thousand). The result, of shape
+    (len(values), len(initial_states) * n_periods, 2), is cached on disk
+    by a hash of all the arguments which change it.
+    """
+    params = dict(DUFFING_PARAMS, **(params or dict()))
+    if parameter not in params:
+        raise ValueError(
+            f"Unknown parameter '{parameter}'. Choose one of {', '.join(params)}."
+        )
+    if values is None:
+        values = [params[parameter]]
+    values = np.array(values, dtype=float)
+    initial_states = np.array(initial_states, dtype=float).reshape(-1, 2)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    cache = cache or TrajectoryCache(os.path.join(get_cache_dir(), "poincare_sections"))
+    key_params = dict(
+        params,
+        parameter=parameter,
+        n_periods=n_periods,
+        n_transient=n_transient,
+        steps_per_period=steps_per_period,
+        initial_states=initial_states.tolist(),
+        phase=phase,
+    )
+    path = cache.get_path(cache.get_key(key_params, values))
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used
+        return np.load(path, mmap_mode="r")
+
+    chunk_size = chunk_size or -(-len(values) // n_workers)
+    chunks = np.array_split(values, max(1, -(-len(values) // chunk_size)))
+    args = [
+        (
+            dict(params, **{parameter: chunk}),
+            initial_states, n_periods, n_transient, steps_per_period, phase,
+        )
+        for chunk in chunks
+    ]
+
+    log.info(
+        "Computing Poincaré sections for %d values of %s (%d periods each) "
+        "in %d chunks on %d processes",
+        len(values), parameter, n_transient + n_periods, len(chunks), n_workers,
+    )
+    start = time.perf_counter()
+    if n_workers == 1 or len(chunks) == 1:
+        results = [compute_poincare_sections(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(compute_poincare_sections, *zip(*args)))
+    sections = np.concatenate(results).astype(cache.dtype)
+    log.info("Computed Poincaré sections in %.1f s", time.perf_counter() - start)
+
+    cache.evict(extra_size=sections.nbytes)
+    # written to a temporary file first, like the trajectories
+    temp_path = path[:-4] + ".part.npy"
+    np.save(temp_path, sections)
+    os.replace(temp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def get_bifurcation_points(
+    values: np.ndarray,
+    sections: np.ndarray,
+    axes=None,
+    coordinate: int = 0,
+) -> np.ndarray:
+    """
+    Points (value, x) (or (value, v) with coordinate=1) of every sample of
+    `sections`, as an (n, 3) array which can be given to a DotCloud,
+    placed on `axes` if given.
+    """
+    n_values, n_samples, _ = sections.shape
+    xs = np.repeat(np.asarray(values, dtype=float), n_samples)
+    ys = np.asarray(sections[:, :, coordinate], dtype=float).ravel()
+    if axes is not None:
+        return axes.c2p(xs, ys)
+    return np.column_stack([xs, ys, np.zeros_like(xs)])
+
+
+def get_poincare_points(section: np.ndarray, axes=None) -> np.ndarray:
+    """
+    The (x, v) samples of one Poincaré section as an (n, 3) array
+    for a DotCloud, placed on `axes` if given.
+    """
+    section = np.asarray(section, dtype=float).reshape(-1, 2)
+    if axes is not None:
+        return axes.c2p(section[:, 0], section[:, 1])
+    return np.column_stack([section, np.zeros(len(section))])
@@ -0,0 +1,127 @@
+from functools import lru_cache
+import numpy as np
+from manimlib.utils.color import color_to_rgb
+
+
+@lru_cache
+def get_lut_table(colors: tuple, size: int = 256, gamma: float = 2.0) -> np.ndarray:
+    """
+    A (size, 3) float32 table of rgb values going evenly through `colors`.
+
+    The colors are interpolated after raising them to `gamma` and brought back
+    with the inverse power, which keeps the middle of a gradient as bright as
+    its ends (gamma=2 is the same as interpolating squared colors and then
+    taking the square root).
+    """
+    rgbs = np.array([color_to_rgb(color) for color in colors]) ** gamma
+    if len(rgbs) == 1:
+        rgbs = np.repeat(rgbs, 2, axis=0)
+
+    alphas = np.linspace(0, len(rgbs) - 1, size)
+    lower = np.minimum(alphas.astype(int), len(rgbs) - 2)
+    weights = (alphas - lower)[:, np.newaxis]
+    table = (1 - weights) * rgbs[lower] + weights * rgbs[lower + 1]
+
+    table = (table ** (1 / gamma)).astype(np.float32)
+    table.flags.writeable = False
+    return table
+
+
+class ColorLUT:
+    """
+    Maps values to colors by indexing a precomputed gradient table,
+    so coloring millions of points is a single `take`.
+
+    `normalization` decides which values go to the ends of the gradient:
+        "fixed"      the given `value_range`
+        "frame"      the min and max of the values of each call
+        "streaming"  the min and max of all the values seen so far
+
+    Instances can be used as the color_map of a VectorField.
+
+    Usage:
+        lut = ColorLUT(VIBGYOR, normalization="streaming")
+        lut.color_mobject(dots, speeds)
+    """
+
+    def __init__(
+        self,
+        colors,
+        size: int = 256,
+        gamma: float = 2.0,
+        normalization: str = "frame",
+        value_range: tuple = (0.0, 1.0),
+    ):
+        if normalization not in ("fixed", "frame", "streaming"):
+            raise ValueError(f"Unknown normalization '{normalization}'")
+
+        self.rgb_table = get_lut_table(tuple(colors), size, gamma)
+        self.rgba_table = np.ones((size, 4), dtype=np.float32)
+        self.rgba_table[:, :3] = self.rgb_table
+        self.size = size
+        self.normalization = normalization
+
+        self.value_range = value_range
+        if normalization == "streaming":
+            self.value_range = (np.inf, -np.inf)
+
+        # scratch buffers, reallocated when the number of values changes
+        self.scaled = np.zeros(0, dtype=np.float32)
+        self.indices = np.zeros(0, dtype=np.intp)
+
+    def reset(self) -> None:
+        if self.normalization == "streaming":
+            self.value_range = (np.inf, -np.inf)
+
+    def get_value_range(self, values: np.ndarray) -> tuple:
+        if self.normalization == "fixed":
+            return self.value_range
+
+        low, high = float(values.min()), float(values.max())
+        if self.normalization == "streaming":
+            low = min(low, self.value_range[0])
+            high = max(high, self.value_range[1])
+        self.value_range = (low, high)
+        return self.value_range
+
+    def get_indices(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values).reshape(-1)
+        if len(self.indices) != len(values):
+            self.scaled = np.zeros(len(values), dtype=np.float32)
+            self.indices = np.zeros(len(values), dtype=np.intp)
+
+        low, high = self.get_value_range(values)
+        scale = (self.size - 1) / (high - low) if high > low else 0.0
+
+        # rounded to the nearest entry of the table
+        scaled = self.scaled
+        np.subtract(values, low, out=scaled, casting="unsafe")
+        np.multiply(scaled, scale, out=scaled)
+        np.add(scaled, 0.5, out=scaled)
+        np.clip(scaled, 0, self.size - 1, out=scaled)
+        self.indices[:] = scaled
+        return self.indices
+
+    def __call__(self, values: np.ndarray) -> np.ndarray:
+        """
+        Returns an (n, 4) array of rgba values (with an opacity of 1).
+        """
+        return self.rgba_table.take(self.get_indices(values), axis=0)
+
+    def map_into(self, values: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Writes the rgb values for `values` into `out`, which may be a strided
+        view, e.g. mobject.data["rgba"][:, :3], leaving the opacities as they are.
+        """
+        return np.take(
+            self.rgb_table, self.get_indices(values), axis=0, out=out, mode="clip"
+        )
+
+    def color_mobject(self, mobject, values: np.ndarray, key: str = "rgba"):
+        """
+        Colors each point of a mobject (e.g. a DotCloud, or a VMobject with
+        key="stroke_rgba") by the corresponding value.
+        """
+        self.map_into(values, mobject.data[key][:, :3])
+        mobject.note_changed_data()
+        return mobject
@@ -0,0 +1,169 @@
+import numpy as np
+from manimlib.constants import WHITE, ORIGIN, DOWN, LEFT
+from manimlib.mobject.geometry import Square
+from manimlib.mobject.types.vectorized_mobject import VGroup, VMobject
+from custom.constants import CYAN
+from custom.integrators import DuffingSystem, BatchedIntegrator
+from custom.objects import get_spring_template
+
+
+class DuffingEnsemble(VGroup):
+    """
+    n Duffing oscillators (springs with unit masses) stacked from top to
+    bottom, each with its own k, gamma, beta, f0 and omega, given as numbers
+    or as arrays of n values.
+
+    The parameters and the states (x, v) are kept as arrays in one
+    DuffingSystem and stepped together by a single updater. All the masses
+    are the subpaths of one VMobject and all the springs of another, so
+    a frame writes the x coordinates of each of them in one batch.
+    """
+
+    def __init__(
+        self,
+        n: int = 1000,
+        k=1,
+        gamma=0,
+        beta=0,
+        f0=0,
+        omega=0,
+        pos=0,
+        vel=0,
+        rest_length: float = 2,
+        color: str = CYAN,
+        side_length: float = 0.5,
+        spacing: float = None,
+        base: np.ndarray = ORIGIN,
+        spring_kwargs: dict = {},
+        **kwargs,
+    ):
+        self.n = n
+        self.rest_length = rest_length
+        self.side_length = side_length
+        self.time = 0
+
+        params = [
+            np.array(np.broadcast_to(p, n), dtype=float)
+            for p in (k, gamma, beta, f0, omega)
+        ]
+        self.system = DuffingSystem(*params)
+        self.integrator = BatchedIntegrator(self.system, method="semi_implicit_euler")
+        self.state = np.zeros((n, 3))
+        self.state[:, 0] = pos
+        self.state[:, 1] = vel
+
+        spacing = spacing or 1.5 * side_length
+        self.bases = np.outer(np.arange(n) - (n - 1) / 2, spacing * DOWN) + base
+        # same dtype as the points, for the batch writes
+        self.lengths = np.zeros(n, dtype=np.float32)
+        self.shifts = np.zeros(n, dtype=np.float32)
+        self.ones = np.ones(n, dtype=np.float32)
+
+        spring_config = dict(radius=0.1, twist_rate=8.0, n_twists=8, lead_length=0.25)
+        spring_config.update(spring_kwargs)
+        stroke_color = spring_config.pop("stroke_color", WHITE)
+        stroke_width = spring_config.pop("stroke_width", 2)
+        self.spring_template = get_spring_template(**spring_config)
+        self.mass_template = Square(side_length=side_length).get_points()
+        self.mass_template -= side_length / 2 * LEFT
+
+        self.springs = self.get_blocks(self.spring_template)
+        self.springs.set_stroke(stroke_color, stroke_width)
+        self.springs.set_flat_stroke(False)
+        self.masses = self.get_blocks(self.mass_template)
+        self.masses.set_fill(color, 1).set_stroke(width=0)
+
+        super().__init__(self.springs, self.masses, **kwargs)
+        self.update_mobjects()
+        # the masses are only moved, and the springs only stretched along
+        # their axis, where the joints of their finely sampled helices stay
+        # nearly straight, so the joint angles are computed once, at rest
+        self.springs.get_joint_angles()
+        self.masses.get_joint_angles()
+
+    def get_blocks(self, template: np.ndarray) -> VMobject:
+        """
+        A copy of `template` at every base, each one followed by
+        a handle on its end to separate it from the next one.
+        """
+        blocks = np.vstack([template, template[-1:]])
+        points = (blocks[np.newaxis] + self.bases[:, np.newaxis]).reshape(-1, 3)
+        return VMobject().set_points(points[:-1])
+
+    def write_block_xs(self, mobject: VMobject, template: np.ndarray, scales, shifts):
+        """
+        x coordinates of the i-th block = scales[i] * template + shifts[i]
+        """
+        points = mobject.data["point"]
+        block_size = len(template) + 1
+        n_full = (self.n - 1) * block_size
+        xs = points[:n_full].reshape(-1, block_size, 3)[:, :-1, 0]
+        np.multiply(template[:, 0], scales[:-1, np.newaxis], out=xs)
+        np.add(xs, shifts[:-1, np.newaxis], out=xs)
+        # the handles separating the blocks
+        points[block_size - 1 : n_full : block_size, 0] = xs[:, -1]
+
+        last = points[n_full:, 0]
+        np.multiply(template[:, 0], scales[-1], out=last)
+        np.add(last, shifts[-1], out=last)
+
+        mobject._needs_new_bounding_box = True
+        mobject.note_changed_data()
+
+    def update_mobjects(self):
+        np.add(self.state[:, 0], self.rest_length, out=self.lengths)
+        self.write_block_xs(
+            self.springs, self.spring_template, self.lengths, self.bases[:, 0]
+        )
+
+        np.add(self.lengths, self.bases[:, 0], out=self.shifts)
+        self.write_block_xs(self.masses, self.mass_template, self.ones, self.shifts)
+        return self
+
+    def update_ensemble(self, dt: float):
+        if dt == 0:
+            return self
+        self.integrator.step(self.state, self.time, dt)
+        self.time += dt
+        return self.update_mobjects()
+
+    def get_pos(self) -> np.ndarray:
+        return self.state[:, 0]
+
+    def get_momentum(self) -> np.ndarray:
+        return self.state[:, 1]
+
+    def set_k(self, k):
+        self.system.k[:] = k
+        return self
+
+    def set_gamma(self, gamma):
+        self.system.gamma[:] = gamma
+        return self
+
+    def set_beta(self, beta):
+        self.system.beta[:] = beta
+        return self
+
+    def set_forcing(self, f0=None, omega=None):
+        if f0 is not None:
+            self.system.f0[:] = f0
+        if omega is not None:
+            self.system.omega[:] = omega
+        return self
+
+    def get_ke(self) -> np.ndarray:
+        return self.get_momentum() ** 2 / 2
+
+    def get_pe(self) -> np.ndarray:
+        x = self.get_pos()
+        return (self.system.k * x**2 + self.system.beta * x**4 / 2) / 2
+
+    def get_te(self) -> np.ndarray:
+        return self.get_ke() + self.get_pe()
+
+    def start_simulation(self):
+        self.add_updater(lambda m, dt: m.update_ensemble(dt))
+
+    def stop_simulation(self):
+        self.clear_updaters()
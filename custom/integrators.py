@@ -0,0 +1,272 @@
+import numpy as np
+
+
+class ODESystem:
+    """
+    Base class for autonomous or time-dependent systems of first order ODEs
+    acting on a batch of states of shape (N, dim).
+
+    Subclasses implement `derivative`, which must write ds/dt into `out`
+    without allocating new arrays, so that an integrator can step millions
+    of states every frame.
+    """
+
+    dim: int = 3
+    # axes holding positions and velocities (only needed by semi-implicit euler)
+    position_axes: tuple = ()
+    velocity_axes: tuple = ()
+
+    def allocate(self, n: int, dtype: np.dtype) -> None:
+        """
+        Called by the integrator whenever the batch size or the dtype changes.
+        Use it to preallocate the scratch buffers used in `derivative`.
+        """
+        pass
+
+    def derivative(self, state: np.ndarray, t: float, out: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class DuffingSystem(ODESystem):
+    """
+    x'' + kx + gamma x' + beta x^3 = f0 cos(omega t)
+
+    The state of each particle is stored as (x, x', 0) like the points of a DotCloud.
+
+    Any of the parameters can also be an array with one value per particle
+    (stored as a struct of arrays), e.g. to sweep beta over an ensemble.
+    """
+
+    position_axes = (0,)
+    velocity_axes = (1,)
+
+    def __init__(
+        self,
+        k: float = 1,
+        gamma: float = 0,
+        beta: float = 0,
+        f0: float = 0,
+        omega: float = 0,
+    ):
+        self.k = k
+        self.gamma = gamma
+        self.beta = beta
+        self.f0 = f0
+        self.omega = omega
+        self.tmp = np.zeros(0)
+
+    def allocate(self, n: int, dtype: np.dtype) -> None:
+        self.tmp = np.zeros(n, dtype=dtype)
+
+    def has_scalar_forcing(self) -> bool:
+        return np.ndim(self.f0) == 0 and np.ndim(self.omega) == 0
+
+    def get_forcing(self, t: float):
+        if self.has_scalar_forcing():
+            return self.f0 * np.cos(self.omega * t)
+        return self.f0 * np.cos(np.multiply(self.omega, t))
+
+    def derivative(self, state: np.ndarray, t: float, out: np.ndarray) -> np.ndarray:
+        x, v = state[:, 0], state[:, 1]
+        dx, dv = out[:, 0], out[:, 1]
+        tmp = self.tmp
+
+        np.copyto(dx, v)
+
+        # dv = -kx - gamma v - beta x^3 + f0 cos(omega t)
+        np.multiply(x, self.k, out=dv)
+        np.negative(dv, out=dv)
+        np.multiply(v, self.gamma, out=tmp)
+        np.subtract(dv, tmp, out=dv)
+        np.multiply(x, x, out=tmp)
+        np.multiply(tmp, x, out=tmp)
+        np.multiply(tmp, self.beta, out=tmp)
+        np.subtract(dv, tmp, out=dv)
+        if self.has_scalar_forcing():
+            np.add(dv, self.get_forcing(t), out=dv)
+        else:
+            np.multiply(self.omega, t, out=tmp)
+            np.cos(tmp, out=tmp)
+            np.multiply(tmp, self.f0, out=tmp)
+            np.add(dv, tmp, out=dv)
+
+        out[:, 2:] = 0
+        return out
+
+
+class LorenzSystem(ODESystem):
+    """
+    x' = a(y - x), y' = x(b - z) - y, z' = xy - cz
+    """
+
+    def __init__(self, a: float = 10, b: float = 28, c: float = 8 / 3):
+        self.a = a
+        self.b = b
+        self.c = c
+        self.tmp = np.zeros(0)
+
+    def allocate(self, n: int, dtype: np.dtype) -> None:
+        self.tmp = np.zeros(n, dtype=dtype)
+
+    def derivative(self, state: np.ndarray, t: float, out: np.ndarray) -> np.ndarray:
+        x, y, z = state[:, 0], state[:, 1], state[:, 2]
+        dx, dy, dz = out[:, 0], out[:, 1], out[:, 2]
+        tmp = self.tmp
+
+        np.subtract(y, x, out=dx)
+        np.multiply(dx, self.a, out=dx)
+
+        np.subtract(self.b, z, out=dy)
+        np.multiply(dy, x, out=dy)
+        np.subtract(dy, y, out=dy)
+
+        np.multiply(x, y, out=dz)
+        np.multiply(z, self.c, out=tmp)
+        np.subtract(dz, tmp, out=dz)
+        return out
+
+
+class BatchedIntegrator:
+    """
+    Steps a batch of states of an ODESystem in place.
+
+    All the intermediate arrays are allocated once (and again only if the size
+    of the batch changes), so stepping a million particles every frame
+    doesn't create any temporary arrays.
+
+    Available methods: "euler", "semi_implicit_euler" and "rk4".
+
+    Usage inside an updater:
+        integrator = BatchedIntegrator(DuffingSystem(-1, 0.1, 0.25, 2.5, 2))
+        dots.add_updater(lambda m, dt: integrator.step_mobject(m, self.time, dt))
+    """
+
+    methods = ("euler", "semi_implicit_euler", "rk4")
+
+    def __init__(
+        self,
+        system: ODESystem,
+        method: str = "euler",
+        n_substeps: int = 1,
+        time_scale: float = 1.0,
+    ):
+        if method not in self.methods:
+            raise ValueError(
+                f"Unknown method '{method}'. Choose one of {', '.join(self.methods)}."
+            )
+        if method == "semi_implicit_euler" and not system.velocity_axes:
+            raise ValueError(
+                f"{system.__class__.__name__} doesn't define velocity_axes, "
+                "which semi_implicit_euler needs."
+            )
+
+        self.system = system
+        self.method = method
+        self.n_substeps = n_substeps
+        self.time_scale = time_scale
+
+        self.shape = None
+        self.dtype = None
+
+    def allocate(self, state: np.ndarray) -> None:
+        if state.shape == self.shape and state.dtype == self.dtype:
+            return
+
+        self.shape = state.shape
+        self.dtype = state.dtype
+        n_buffers = 5 if self.method == "rk4" else 1
+        buffers = np.zeros((n_buffers, *state.shape), dtype=state.dtype)
+        # k1 (or the only derivative buffer for euler), k2, k3, k4, temp state
+        self.k1, *rest = buffers
+        if self.method == "rk4":
+            self.k2, self.k3, self.k4, self.tmp_state = rest
+        self.system.allocate(len(state), state.dtype)
+
+    def step(
+        self,
+        state: np.ndarray,
+        t: float,
+        dt: float,
+        n_steps: int = None,
+    ) -> np.ndarray:
+        """
+        Advances `state` (modified in place) by `dt` from the time `t`, both
+        in the time of the scene, in `n_steps` equal sub steps, and returns it.
+        The system is integrated over dt * time_scale, starting from the time
+        t * time_scale, so time dependent systems see the time of each sub step,
+        t * time_scale + i * h. With rk4, `t` and `dt` can also be arrays with
+        one value per state.
+        """
+        self.allocate(state)
+        n_steps = n_steps or self.n_substeps
+        h = dt * self.time_scale / n_steps
+        t = t * self.time_scale
+        step_func = getattr(self, f"{self.method}_step")
+
+        for i in range(n_steps):
+            step_func(state, t + i * h, h)
+
+        return state
+
+    def step_mobject(self, mobject, t: float, dt: float, n_steps: int = None):
+        """
+        Steps the points of a (DotCloud like) mobject in place.
+        """
+        self.step(mobject.get_points(), t, dt, n_steps)
+        mobject.note_changed_data()
+        return mobject
+
+    def euler_step(self, state: np.ndarray, t: float, h: float) -> None:
+        k1 = self.system.derivative(state, t, self.k1)
+        np.multiply(k1, h, out=k1)
+        np.add(state, k1, out=state)
+
+    def semi_implicit_euler_step(self, state: np.ndarray, t: float, h: float) -> None:
+        system = self.system
+        k1 = self.k1
+
+        # kick the velocities first, then drift positions with new velocities
+        system.derivative(state, t, k1)
+        for axis in system.velocity_axes:
+            kick = k1[:, axis]
+            kick *= h
+            state[:, axis] += kick
+
+        system.derivative(state, t, k1)
+        for axis in system.position_axes:
+            drift = k1[:, axis]
+            drift *= h
+            state[:, axis] += drift
+
+    def rk4_step(self, state: np.ndarray, t, h) -> None:
+        """
+        `t` and `h` can also be arrays with one time and step size per state.
+        """
+        derivative = self.system.derivative
+        k1, k2, k3, k4, tmp = self.k1, self.k2, self.k3, self.k4, self.tmp_state
+        t_half = t + np.multiply(h, 0.5)
+        t_full = t + h
+        if np.ndim(h) > 0:
+            h = np.asarray(h)[:, np.newaxis]
+
+        derivative(state, t, k1)
+
+        np.multiply(k1, h / 2, out=tmp)
+        np.add(state, tmp, out=tmp)
+        derivative(tmp, t_half, k2)
+
+        np.multiply(k2, h / 2, out=tmp)
+        np.add(state, tmp, out=tmp)
+        derivative(tmp, t_half, k3)
+
+        np.multiply(k3, h, out=tmp)
+        np.add(state, tmp, out=tmp)
+        derivative(tmp, t_full, k4)
+
+        # state += h / 6 * (k1 + 2 k2 + 2 k3 + k4)
+        np.add(k2, k3, out=k2)
+        np.multiply(k2, 2, out=k2)
+        np.add(k1, k2, out=k1)
+        np.add(k1, k4, out=k1)
+        np.multiply(k1, h / 6, out=k1)
+        np.add(state, k1, out=state)
@@ -0,0 +1,146 @@
+import numpy as np
+from custom.integrators import ODESystem, BatchedIntegrator
+from custom.stats import RunningStats
+
+
+class LyapunovEnsemble:
+    """
+    Estimates the largest Lyapunov exponent of an ODESystem around an initial
+    state with Benettin's method, using `n_copies` perturbed copies at once.
+
+    The reference trajectory and the copies (each `d0` away from it, in random
+    directions of the phase space spanned by `axes`) are stepped in one batch.
+    Every `renormalization_time` (in the time of the system), the rate at which
+    each separation grew is fed to a RunningStats, and the copies are pulled
+    back to a distance of d0 along their current direction, so that they keep
+    following the most expanding direction instead of saturating.
+
+    The exponent and the statistics of the separations are cheap to read,
+    so they can be shown live by updaters.
+
+    Usage:
+        engine = LyapunovEnsemble(DuffingSystem(-1, 0.1, 0.25, 2.5, 2), [0.5, 0, 0])
+        dot.add_updater(lambda m, dt: m.move_to(engine.step(dt).get_reference()))
+        number.f_always.set_value(engine.get_lyapunov_exponent)
+    """
+
+    def __init__(
+        self,
+        system: ODESystem,
+        initial_state,
+        n_copies: int = 1000,
+        d0: float = 1e-6,
+        renormalization_time: float = 0.5,
+        axes: tuple = None,
+        method: str = "rk4",
+        n_substeps: int = 4,
+        time_scale: float = 1.0,
+        t0: float = 0.0,
+        seed: int = 0,
+    ):
+        self.system = system
+        self.integrator = BatchedIntegrator(system, method, n_substeps, time_scale)
+        self.n_copies = n_copies
+        self.d0 = d0
+        self.renormalization_time = renormalization_time
+        self.time = t0
+        self.time_since_renormalization = 0.0
+
+        if axes is None:
+            axes = system.position_axes + system.velocity_axes or range(system.dim)
+        self.axes = list(axes)
+        # zero on the axes which aren't part of the separations
+        self.axis_mask = np.zeros(system.dim)
+        self.axis_mask[self.axes] = 1
+
+        # the reference state, followed by the copies
+        self.states = np.zeros((n_copies + 1, system.dim))
+        self.states[:] = initial_state
+        directions = np.random.default_rng(seed).normal(size=(n_copies, system.dim))
+        directions *= self.axis_mask
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        self.states[1:] += d0 * directions
+
+        self.diffs = np.zeros((n_copies, system.dim))
+        self.separations = np.zeros(n_copies)
+        self.log_ratios = np.zeros(n_copies)
+        # log(separation / d0) gathered at every renormalization, per copy
+        self.log_growth = np.zeros(n_copies)
+        self.growth_rates = RunningStats()
+        self.update_separations()
+
+    def get_reference(self) -> np.ndarray:
+        return self.states[0]
+
+    def get_copies(self) -> np.ndarray:
+        return self.states[1:]
+
+    def update_separations(self) -> np.ndarray:
+        diffs = self.diffs
+        np.subtract(self.states[1:], self.states[0], out=diffs)
+        np.multiply(diffs, self.axis_mask, out=diffs)
+        np.einsum("ij,ij->i", diffs, diffs, out=self.separations)
+        np.sqrt(self.separations, out=self.separations)
+        return self.separations
+
+    def get_log_ratios(self) -> np.ndarray:
+        """
+        log(separation / d0) of every copy since the last renormalization.
+        """
+        log_ratios = self.log_ratios
+        np.divide(self.separations, self.d0, out=log_ratios)
+        np.maximum(log_ratios, np.finfo(float).tiny, out=log_ratios)
+        np.log(log_ratios, out=log_ratios)
+        return log_ratios
+
+    def renormalize(self) -> None:
+        log_ratios = self.get_log_ratios()
+        self.log_growth += log_ratios
+        self.growth_rates.update(log_ratios / self.time_since_renormalization)
+
+        # copies = reference + diffs * d0 / separation
+        scales = self.separations
+        np.maximum(scales, np.finfo(float).tiny, out=scales)
+        np.divide(self.d0, scales, out=scales)
+        np.multiply(self.diffs, scales[:, np.newaxis], out=self.diffs)
+        np.add(self.diffs, self.states[0], out=self.states[1:])
+
+        self.time_since_renormalization = 0.0
+        self.update_separations()
+
+    def step(self, dt: float, n_steps: int = None) -> "LyapunovEnsemble":
+        if dt == 0:
+            return self
+        self.integrator.step(self.states, self.time, dt, n_steps)
+        self.time += dt
+        self.time_since_renormalization += dt * self.integrator.time_scale
+
+        self.update_separations()
+        if self.time_since_renormalization >= self.renormalization_time:
+            self.renormalize()
+        return self
+
+    def get_lyapunov_exponent(self, default: float = 0.0) -> float:
+        """
+        Mean growth rate of the separations over all the renormalizations so far.
+        """
+        return self.growth_rates.get_mean(default)
+
+    def get_lyapunov_std(self, default: float = 0.0) -> float:
+        return self.growth_rates.get_std(default)
+
+    def get_log_divergence(self) -> float:
+        """
+        Mean over the copies of log(separation / d0), as if the copies had never
+        been renormalized (it grows like the exponent times the elapsed time).
+        """
+        return float((self.log_growth + self.get_log_ratios()).mean())
+
+    def get_separations(self) -> np.ndarray:
+        return self.separations
+
+    def get_mean_separation(self) -> float:
+        return float(self.separations.mean())
+
+    def get_max_separation(self) -> float:
+        return float(self.separations.max())
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class MarblePuzzleSimulator:
+    """
+    Monte Carlo simulation of the marble puzzle:
+
+    A bag has `n_balls` balls, out of which n are red, n being uniformly
+    chosen from [0, n_balls]. Given that the first drawn ball is red,
+    what's the probability that the second one is red as well?
+
+    A trial only needs n and two draws, so instead of shuffling bags,
+    the draws are sampled directly (first red with probability n / N,
+    second red with probability (n - 1) / (N - 1)), which is vectorized
+    over batches of trials.
+    """
+
+    def __init__(self, n_balls: int = 100, batch_size: int = 100, seed: int = None):
+        self.n_balls = n_balls
+        self.batch_size = batch_size
+        # by default, follow the global seed which Scene sets for each render
+        seed = np.random.randint(2**32) if seed is None else seed
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, shape) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns boolean arrays (first ball is red, both balls are red)
+        for trials of the given shape.
+        """
+        rng = self.rng
+        n_balls = self.n_balls
+        n_reds = rng.integers(0, n_balls + 1, size=shape)
+
+        first_red = rng.random(shape) * n_balls < n_reds
+        second_red = rng.random(shape) * (n_balls - 1) < n_reds - 1
+        return first_red, first_red & second_red
+
+    def run(self, n_batches: int) -> np.ndarray:
+        """
+        Runs `n_batches` batches of `batch_size` trials, and returns the
+        estimate of P(second red | first red) of each batch.
+        """
+        first_red, both_red = self.sample((n_batches, self.batch_size))
+        r1 = first_red.sum(axis=1)
+        r2 = both_red.sum(axis=1)
+        return r2 / np.maximum(r1, 1)
+
+    def estimate(self, n_trials: int, chunk_size: int = 10**6) -> float:
+        """
+        Estimates P(second red | first red) over `n_trials` trials,
+        in chunks so that memory stays bounded.
+        """
+        r1 = r2 = 0
+        for start in range(0, n_trials, chunk_size):
+            first_red, both_red = self.sample(min(chunk_size, n_trials - start))
+            r1 += first_red.sum()
+            r2 += both_red.sum()
+        return r2 / r1
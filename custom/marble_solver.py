@@ -0,0 +1,93 @@
+import math
+from fractions import Fraction
+from functools import lru_cache
+from statistics import NormalDist
+
+
+@lru_cache(maxsize=None)
+def get_sequence_weight(n_balls: int, n_reds: int, n_blues: int) -> int:
+    """
+    Number of ways, summed over every number n of red balls in the bag, to draw
+    `n_reds` red balls and then `n_blues` blue ones (in that order) out of it.
+
+    Only the counts matter, not the order of the draws.
+    """
+    if n_reds == 0 and n_blues == 0:
+        return n_balls + 1
+    if n_reds + n_blues > n_balls:
+        return 0
+    return sum(
+        math.perm(n, n_reds) * math.perm(n_balls - n, n_blues)
+        for n in range(n_reds, n_balls - n_blues + 1)
+    )
+
+
+def get_sequence_probability(n_balls: int, n_reds: int, n_blues: int = 0) -> Fraction:
+    """
+    Exact probability of drawing `n_reds` red balls and `n_blues` blue ones, in
+    a given order, from a bag of `n_balls` balls whose number of red balls
+    is uniformly chosen from [0, n_balls].
+    """
+    if n_reds + n_blues > n_balls:
+        return Fraction(0)
+    return Fraction(
+        get_sequence_weight(n_balls, n_reds, n_blues),
+        (n_balls + 1) * math.perm(n_balls, n_reds + n_blues),
+    )
+
+
+def get_conditional_probability(
+    n_balls: int = 100,
+    n_reds: int = 1,
+    n_blues: int = 0,
+    closed_form: bool = True,
+) -> Fraction:
+    """
+    Exact probability that the next drawn ball is red, given that `n_reds` red
+    and `n_blues` blue balls were drawn first (the puzzle is n_reds=1).
+
+    With a uniform number of red balls, it's Laplace's rule of succession,
+    (n_reds + 1) / (n_reds + n_blues + 2), whatever n_balls is. Set closed_form
+    to False to get it from the sums over the bags instead.
+    """
+    n_drawn = n_reds + n_blues
+    if n_drawn >= n_balls:
+        raise ValueError(f"Can't draw a ball after {n_drawn} out of {n_balls}.")
+    if closed_form:
+        return Fraction(n_reds + 1, n_drawn + 2)
+    return get_sequence_probability(
+        n_balls, n_reds + 1, n_blues
+    ) / get_sequence_probability(n_balls, n_reds, n_blues)
+
+
+def get_confidence_width(
+    n_trials: int,
+    confidence: float = 0.95,
+    n_balls: int = 100,
+    n_reds: int = 1,
+) -> float:
+    """
+    Width of the (normal approximation) confidence interval of the Monte Carlo
+    estimate of P(next red | first n_reds red) after `n_trials` trials, where
+    only the trials whose first draws are all red count.
+    """
+    p = get_conditional_probability(n_balls, n_reds)
+    p_condition = get_sequence_probability(n_balls, n_reds)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return 2 * z * math.sqrt(p * (1 - p) / (n_trials * p_condition))
+
+
+def get_required_trials(
+    width: float,
+    confidence: float = 0.95,
+    n_balls: int = 100,
+    n_reds: int = 1,
+) -> int:
+    """
+    Number of Monte Carlo trials for the confidence interval of the estimate
+    of P(next red | first n_reds red) to be at most `width` wide.
+    """
+    p = get_conditional_probability(n_balls, n_reds)
+    p_condition = get_sequence_probability(n_balls, n_reds)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return math.ceil((2 * z / width) ** 2 * p * (1 - p) / p_condition)
@@ -1,10 +1,29 @@
 import os
-import re
+import time
+import moderngl
 import numpy as np
-from manimlib.utils.shaders import get_shader_code_from_file
-from manimlib.constants import UL, DL, UR, DR, FRAME_HEIGHT
+from custom.shader_cache import (
+    ShaderFileWatcher,
+    get_cached_program,
+    release_cached_program,
+)
+from custom.shader_preprocessor import ShaderPreprocessor
+from custom.uniforms import UniformBlock
+from custom.tiled_rendering import TiledShaderWrapper
+from manimlib.extract_scene import manim_config
+from manimlib.constants import (
+    UL, DL, UR, DR, FRAME_HEIGHT, FRAME_WIDTH, ORIGIN, UP, OUT, LEFT, RIGHT, PI, TAU, WHITE
+)
 from manimlib.mobject.mobject import Mobject
-from manimlib.mobject.geometry import Polygon, RegularPolygon
+from manimlib.mobject.functions import ParametricCurve
+from manimlib.mobject.geometry import Circle, Polygon, RegularPolygon
+from manimlib.mobject.types.vectorized_mobject import VMobject
+from manimlib.utils.color import color_gradient, color_to_rgb
+from manimlib.utils.space_ops import angle_of_vector, get_norm, rotation_matrix
+
+
+# (radius, twist_rate, n_twists, lead_length) -> points of a spring of unit length
+SPRING_TEMPLATES: dict[tuple, np.ndarray] = dict()
 
 
 class Star(Polygon):
@@ -34,6 +53,452 @@ class Star(Polygon):
         super().__init__(*points, **kwargs)
 
 
+# Spring is from https://github.com/3b1b/videos
+def get_spring_template(
+    radius: float, twist_rate: float, n_twists: int, lead_length: float
+) -> np.ndarray:
+    """
+    Points of a helical spring along the x-axis, starting at the origin
+    and ending at RIGHT, built only once for every set of parameters.
+    """
+    key = (radius, twist_rate, n_twists, lead_length)
+    if key not in SPRING_TEMPLATES:
+        helix = ParametricCurve(
+            lambda t: [
+                radius * np.cos(TAU * t),
+                radius * np.sin(TAU * t),
+                t / twist_rate,
+            ],
+            t_range=(0, n_twists, 0.01),
+        )
+        helix.rotate(PI / 2, UP)
+
+        spring = VMobject()
+        spring.start_new_path(helix.get_start() + lead_length * LEFT)
+        spring.add_line_to(helix.get_start())
+        spring.append_vectorized_mobject(helix)
+        spring.add_line_to(helix.get_end() + lead_length * RIGHT)
+
+        points = spring.get_points() - spring.get_start()
+        points[:, 0] /= points[-1, 0]
+        points = points.astype(np.float32)
+        points.flags.writeable = False
+        SPRING_TEMPLATES[key] = points
+    return SPRING_TEMPLATES[key]
+
+
+class Spring(VMobject):
+    """
+    A helical spring from `base_point` to the `edge` of `mobject`,
+    following the mobject as it moves.
+
+    On every frame, the cached template of the spring is stretched along
+    its axis and rotated onto the current endpoints with one 3x3 matrix,
+    written straight into the points.
+    """
+
+    def __init__(
+        self,
+        mobject: Mobject,
+        base_point,
+        edge=ORIGIN,
+        stroke_color=WHITE,
+        stroke_width=2,
+        twist_rate=8.0,
+        n_twists=8,
+        radius=0.1,
+        lead_length=0.25,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+
+        self.template = get_spring_template(radius, twist_rate, n_twists, lead_length)
+        self.transform_matrix = np.zeros((3, 3), dtype=np.float32)
+        self.set_points(self.template)
+
+        self.set_stroke(color=stroke_color, width=stroke_width)
+        self.set_flat_stroke(False)
+
+        base_point = np.array(base_point, dtype=float)
+        self.add_updater(
+            lambda m: m.put_between(base_point, mobject.get_edge_center(edge))
+        )
+
+    def put_between(self, start: np.ndarray, end: np.ndarray):
+        """
+        Same as put_start_and_end_on, after stretching the spring to
+        the distance between start and end, but in a single pass.
+        """
+        vect = end - start
+        xy_length = get_norm(vect[:2])
+
+        # rotations as done by put_start_and_end_on
+        rotation = rotation_matrix(angle_of_vector(vect), OUT)
+        axis = np.array([-vect[1], vect[0], 0]) if xy_length > 0 else UP
+        elevation = np.arctan2(vect[2], xy_length)
+        if elevation != 0:
+            rotation = rotation_matrix(-elevation, axis) @ rotation
+
+        # the axis of the spring goes to vect, its cross-section is only rotated
+        matrix = self.transform_matrix
+        matrix[:] = rotation
+        matrix[:, 0] = vect
+
+        points = self.data["point"]
+        np.matmul(self.template, matrix.T, out=points)
+        points += start.astype(np.float32)
+
+        self.refresh_joint_angles()
+        self.refresh_unit_normal()
+        self.refresh_bounding_box()
+        self.note_changed_data()
+        return self
+
+    def get_length(self):
+        return get_norm(self.get_end() - self.get_start())
+
+
+class RadialLayers(VMobject):
+    """
+    Concentric circles around the origin, one for each of `radii`, stored as
+    the subpaths of a single VMobject, and colored by a gradient from the
+    innermost to the outermost one.
+
+    The opacity of every layer is set at once with set_opacity_by_radius.
+    """
+
+    def __init__(
+        self,
+        radii,
+        colors=(WHITE,),
+        stroke_width: float = 4,
+        **kwargs,
+    ):
+        self.radii = np.array(radii, dtype=float)
+        super().__init__(**kwargs)
+
+        # every circle is followed by a copy of its last point,
+        # which starts the next subpath (as in start_new_path)
+        circle = Circle().get_points()
+        n_layers, n_points = len(self.radii), len(circle) + 1
+        points = np.zeros((n_layers, n_points, 3))
+        points[:, :-1] = self.radii[:, np.newaxis, np.newaxis] * circle
+        points[:, -1] = points[:, -2]
+        self.set_points(points.reshape(-1, 3)[:-1])
+
+        # layer of each point
+        self.layer_indices = np.repeat(np.arange(n_layers), n_points)[:-1]
+        self.layer_opacities = np.ones(n_layers)
+
+        self.set_stroke(width=stroke_width, opacity=1)
+        self.set_fill(opacity=0)
+        rgbs = np.array([color_to_rgb(c) for c in color_gradient(colors, n_layers)])
+        self.data["stroke_rgba"][:, :3] = rgbs[self.layer_indices]
+
+    def set_layer_opacities(self, opacities: np.ndarray):
+        np.take(
+            opacities, self.layer_indices, out=self.data["stroke_rgba"][:, 3]
+        )
+        self.note_changed_data()
+        return self
+
+    def set_opacity_by_radius(
+        self,
+        radius: float,
+        inside_opacity: float = 1.0,
+        outside_opacity: float = 0.005,
+    ):
+        """
+        Layers with a radius greater than `radius` get `outside_opacity`,
+        the others `inside_opacity`.
+        """
+        opacities = self.layer_opacities
+        opacities[:] = inside_opacity
+        opacities[self.radii > radius] = outside_opacity
+        return self.set_layer_opacities(opacities)
+
+
+class StreamingPlot(VMobject):
+    """
+    A polyline in the xy-plane which grows by one point at a time,
+    e.g. a live plot of some value against time.
+
+    The points live in preallocated data whose capacity doubles when full,
+    and everything past the latest point is hidden with a stroke width of 0,
+    so adding a point only writes a couple of entries (the joint angles
+    included) instead of copying the whole array.
+
+    A point closer than `min_distance` (one pixel by default) to the
+    previous corner moves the tip of the plot instead of adding a corner.
+    With `max_corners`, only that many of the latest corners are kept.
+    """
+
+    def __init__(
+        self,
+        start_point=ORIGIN,
+        min_distance: float = None,
+        max_corners: int = None,
+        capacity: int = 256,
+        **kwargs,
+    ):
+        if min_distance is None:
+            min_distance = FRAME_WIDTH / manim_config.camera.resolution[0]
+        self.min_distance = min_distance
+        self.max_corners = max_corners
+        # live corners are first, ..., first + n_corners - 1
+        self.first = 0
+        self.n_corners = 0
+
+        super().__init__(**kwargs)
+        self.set_points(np.repeat([start_point], 2 * capacity - 1, axis=0))
+        self.first, self.n_corners = 0, 1
+        self.hide_unused_points()
+
+        # the joint angles are kept up to date by add_point
+        self.data["joint_angle"] = 0
+        self.needs_new_joint_angles = False
+        self.data["base_normal"][1::2] = OUT
+        self.needs_new_unit_normal = False
+
+    def get_live_slice(self) -> slice:
+        return slice(2 * self.first, 2 * (self.first + self.n_corners) - 1)
+
+    def get_live_points(self) -> np.ndarray:
+        return self.get_points()[self.get_live_slice()]
+
+    def hide_unused_points(self) -> None:
+        widths = self.data["stroke_width"]
+        live = self.get_live_slice()
+        widths[: live.start] = 0
+        widths[live.stop:] = 0
+
+    def set_stroke(self, *args, **kwargs):
+        super().set_stroke(*args, **kwargs)
+        if self.n_corners > 0:
+            self.hide_unused_points()
+        return self
+
+    def compute_bounding_box(self) -> np.ndarray:
+        points = self.get_live_points()
+        if len(points) == 0:
+            return super().compute_bounding_box()
+        mins, maxs = points.min(0), points.max(0)
+        return np.array([mins, (mins + maxs) / 2, maxs])
+
+    def make_room(self) -> None:
+        """
+        Moves the live points to the front if the dropped corners take at least
+        as much room as the live ones, or else doubles the capacity, so that
+        either way, the copies cost a constant time per added point.
+        """
+        live = self.get_live_slice()
+        n_live = live.stop - live.start
+        if live.start >= n_live:
+            self.data[:n_live] = self.data[live]
+        else:
+            data = np.zeros(2 * len(self.data) + 1, dtype=self.data.dtype)
+            data[:n_live] = self.data[live]
+            self.data = data
+        self.data[n_live:] = self.data[n_live - 1]
+        self.first = 0
+        self.hide_unused_points()
+        self.subpath_end_indices = None
+
+    def update_joint_angle(self, corner: int) -> None:
+        index = 2 * corner
+        angles = self.data["joint_angle"][:, 0]
+        if corner == self.first or corner == self.first + self.n_corners - 1:
+            angles[index] = 0
+            return
+        points = self.get_points()
+        v_in = points[index] - points[index - 1]
+        v_out = points[index + 1] - points[index]
+        diff = np.arctan2(v_out[1], v_out[0]) - np.arctan2(v_in[1], v_in[0])
+        angles[index] = (diff + PI) % TAU - PI
+
+    def add_point(self, point):
+        point = np.asarray(point, dtype=np.float32)
+        points = self.get_points()
+        tip = self.first + self.n_corners - 1
+
+        if (
+            self.n_corners >= 2
+            and get_norm(point - points[2 * tip - 2]) < self.min_distance
+        ):
+            corner = tip
+        else:
+            if self.max_corners and self.n_corners >= self.max_corners:
+                # collapse the oldest segment onto the next corner
+                start = 2 * self.first
+                points[start:start + 2] = points[start + 2]
+                self.data["stroke_width"][start:start + 2] = 0
+                self.first += 1
+                self.n_corners -= 1
+                self.update_joint_angle(self.first)
+                self._needs_new_bounding_box = True
+            if 2 * tip + 2 >= len(points):
+                self.make_room()
+                points = self.get_points()
+                tip = self.first + self.n_corners - 1
+            corner = tip + 1
+            self.n_corners += 1
+            widths = self.data["stroke_width"]
+            widths[2 * corner - 1:2 * corner + 1] = widths[2 * corner - 2]
+
+        index = 2 * corner
+        points[index] = point
+        points[index - 1] = 0.5 * (points[index - 2] + point)
+        # the curve right after the tip has no length
+        points[index + 1:index + 3] = point
+
+        self.update_joint_angle(corner - 1)
+        self.update_joint_angle(corner)
+
+        if not self._needs_new_bounding_box:
+            bb = self.bounding_box
+            np.minimum(bb[0], point, out=bb[0])
+            np.maximum(bb[2], point, out=bb[2])
+            bb[1] = 0.5 * (bb[0] + bb[2])
+        self.note_changed_data()
+        return self
+
+
+class RingTrail(VMobject):
+    """
+    Trails of fixed length behind one or many moving points, all drawn
+    as a single mobject, similar to TracingTail.
+
+    `mobject_or_func` is a mobject (its center is traced) or a function
+    returning the current point, or an (n, 3) array of points, one per trail.
+
+    Each trail is a closed ring of corners in preallocated data. Every frame
+    the oldest corner is overwritten by the newest one, and the curve from
+    the newest corner to the oldest is hidden by putting its handle on its
+    start (curves like that aren't drawn), so only three points per trail
+    are written. Width and opacity go from the tail to the head of each
+    trail when given as (tail, head) pairs.
+
+    `fps` is the frame rate of the scene (self.camera.fps), which sets how
+    many corners cover `time_traced`. It's the one of the config by default.
+    """
+
+    def __init__(
+        self,
+        mobject_or_func,
+        time_traced: float = 1.0,
+        stroke_width=(0, 3),
+        stroke_opacity=(0, 1),
+        stroke_color=WHITE,
+        fps: float = None,
+        **kwargs,
+    ):
+        if isinstance(mobject_or_func, Mobject):
+            self.traced_point_func = mobject_or_func.get_center
+        else:
+            self.traced_point_func = mobject_or_func
+        self.width_range = (0, 3)
+        self.opacity_range = (0, 1)
+        fps = fps or manim_config.camera.fps
+        self.n_corners = max(int(time_traced * fps), 2)
+        self.head = 0
+
+        super().__init__(**kwargs)
+
+        start_points = np.array(self.traced_point_func(), dtype=np.float32).reshape(-1, 3)
+        self.n_trails = len(start_points)
+        # corners and handles of the ring, its closing anchor, and
+        # the handle starting the next trail
+        self.block_size = 2 * self.n_corners + 2
+        points = np.repeat(start_points, self.block_size, axis=0)
+        self.set_points(points[:-1])
+
+        self.block_starts = np.arange(self.n_trails) * self.block_size
+        # corner of the ring each point of a block belongs to
+        self.block_corners = np.append(np.arange(2 * self.n_corners) // 2, [0, 0])
+        self.index_buffer = np.zeros(self.n_trails, dtype=int)
+        self.point_buffer = np.zeros((self.n_trails, 3), dtype=np.float32)
+        self.age_buffer = np.zeros(self.block_size, dtype=int)
+        self.value_buffer = np.zeros(self.block_size, dtype=np.float32)
+
+        self.data["joint_angle"] = 0
+        self.needs_new_joint_angles = False
+        self.data["base_normal"][1::2] = OUT
+        self.needs_new_unit_normal = False
+
+        self.set_stroke(stroke_color, stroke_width, stroke_opacity)
+        self.add_updater(lambda m, dt: m.update_trail(dt))
+
+    def set_stroke(self, color=None, width=None, opacity=None, *args, **kwargs):
+        super().set_stroke(color, None, None, *args, **kwargs)
+        if width is not None:
+            self.width_range = tuple(np.resize(width, 2))
+        if opacity is not None:
+            self.opacity_range = tuple(np.resize(opacity, 2))
+        if self.has_points() and hasattr(self, "block_starts"):
+            self.write_fading()
+        return self
+
+    def get_block_view(self, values: np.ndarray) -> tuple:
+        # the last trail has no handle after it
+        n_full = (self.n_trails - 1) * self.block_size
+        return values[:n_full].reshape(-1, self.block_size), values[n_full:]
+
+    def write_fading(self) -> None:
+        """
+        Sets the width and the opacity of every point from the age of its corner.
+        """
+        ages = self.age_buffer
+        np.subtract(self.head, self.block_corners, out=ages)
+        np.remainder(ages, self.n_corners, out=ages)
+
+        values = self.value_buffer
+        for key, (tail, head) in [
+            ("stroke_width", self.width_range),
+            ("stroke_rgba", self.opacity_range),
+        ]:
+            # age 0 is the head, age n_corners - 1 the tail
+            np.multiply(ages, (tail - head) / (self.n_corners - 1), out=values)
+            np.add(values, head, out=values)
+            field = self.data[key][:, 0 if key == "stroke_width" else 3]
+            blocks, last = self.get_block_view(field)
+            blocks[:] = values
+            last[:] = values[:-1]
+
+    def get_indices(self, offset: int) -> np.ndarray:
+        return np.add(self.block_starts, offset, out=self.index_buffer)
+
+    def update_trail(self, dt: float):
+        if dt == 0:
+            return self
+        new_points = np.asarray(self.traced_point_func()).reshape(-1, 3)
+        points = self.data["point"]
+        n = self.n_corners
+        head = self.head = (self.head + 1) % n
+        prev = 2 * (head - 1) if head > 0 else 2 * (n - 1)
+
+        points[self.get_indices(2 * head)] = new_points
+        if head == 0:
+            points[self.get_indices(2 * n)] = new_points
+            if self.n_trails > 1:
+                points[self.get_indices(2 * n + 1)[:-1]] = new_points[:-1]
+
+        # straight segment from the previous corner
+        mid = self.point_buffer
+        np.take(points, self.get_indices(prev), axis=0, out=mid, mode="clip")
+        np.add(mid, new_points, out=mid)
+        mid *= 0.5
+        points[self.get_indices(prev + 1)] = mid
+        # hides the curve from the newest corner back to the oldest one
+        points[self.get_indices(2 * head + 1)] = new_points
+
+        # constant widths and opacities don't depend on the age
+        if len({*self.width_range}) > 1 or len({*self.opacity_range}) > 1:
+            self.write_fading()
+        self._needs_new_bounding_box = True
+        self.note_changed_data()
+        return self
+
+
 class ShaderMobject(Mobject):
     def __init__(
         self,
@@ -41,11 +506,19 @@ class ShaderMobject(Mobject):
         data_dtype: np.dtype = [("point", np.float32, (3,))],
         height: float = FRAME_HEIGHT,
         aspect_ratio: float = 16 / 9,
+        tile_size: int = None,
+        preview_scale: int = 1,
         **kwargs,
     ):
         self.aspect_ratio = aspect_ratio
+        self.tile_size = tile_size
+        self.preview_scale = preview_scale
         self.shader_folder = shader_folder
         self.data_dtype = data_dtype
+        self.preprocessor = ShaderPreprocessor(include_dirs=[shader_folder])
+        self.file_watcher = ShaderFileWatcher(shader_folder, self.preprocessor)
+        self.refresh_timings = dict()
+        self.uniform_block = UniformBlock()
 
         super().__init__(**kwargs)
         self.set_height(height, stretch=True)
@@ -58,41 +531,103 @@ class ShaderMobject(Mobject):
     def set_color(self, *args, **kwargs):
         return self
 
-    @Mobject.affects_data
-    def refresh(self) -> None:
+    def init_shader_wrapper(self, ctx) -> None:
+        self.shader_wrapper = TiledShaderWrapper(
+            ctx=ctx,
+            vert_data=self.data,
+            shader_folder=self.shader_folder,
+            mobject_uniforms=self.uniforms,
+            texture_paths=self.texture_paths,
+            depth_test=self.depth_test,
+            render_primitive=self.render_primitive,
+            code_replacements=self.shader_code_replacements,
+            uniform_block=self.uniform_block,
+            tile_size=self.tile_size,
+            preview_scale=self.preview_scale,
+        )
+
+    def set_tile_size(self, tile_size: int = None):
+        """
+        Renders the shader in scissor tiles of tile_size x tile_size pixels,
+        or in one go if tile_size is None.
+        """
+        self.tile_size = tile_size
+        if self.shader_wrapper is not None:
+            self.shader_wrapper.tile_size = tile_size
+        return self
+
+    def set_preview_scale(self, preview_scale: int = 1):
+        """
+        Renders the shader at 1 / preview_scale of the resolution,
+        and upsamples it to the full one.
+        """
+        self.preview_scale = preview_scale
+        if self.shader_wrapper is not None:
+            self.shader_wrapper.preview_scale = preview_scale
+        return self
+
+    def get_tile_timings(self) -> np.ndarray:
+        if self.shader_wrapper is None:
+            return np.zeros(0)
+        return self.shader_wrapper.tile_timings
+
+    def refresh(self, force: bool = True) -> bool:
         """
         This is used to reload the shaders files
         (frag.glsl, vert.glsl, geom.glsl) in the embed mode.
+
+        Only the stages whose files (or inserted files) changed since the
+        last refresh are expanded again, and a program is compiled only once
+        per combination of sources. The previous program is released, unless
+        the new one fails to compile (raising moderngl.Error), in which case
+        it's kept. Returns whether anything changed, and stores how long the
+        expansion and the compilation took in `refresh_timings`.
+
+        With force=False, the files are polled at most once every
+        `file_watcher.poll_interval` seconds.
         """
+        wrapper = self.shader_wrapper
+        if wrapper is None:
+            # not rendered yet, the wrapper will read the files itself
+            return False
+
+        changed_stages = self.file_watcher.get_changed_stages(force)
+        if not changed_stages:
+            return False
 
-        for shader_type in ["fragment", "vertex", "geometry"]:
-            file_name = f"{shader_type[:4]}.glsl"
-            filepath = os.path.join(self.shader_folder, file_name)
+        start_time = time.perf_counter()
+
+        # only replaces the code of the wrapper once it compiles
+        program_code = dict(wrapper.program_code)
+        for shader_type in changed_stages:
+            filepath = self.file_watcher.get_filepath(shader_type)
+            file_name = os.path.basename(filepath)
 
             if not os.path.exists(filepath):
                 if shader_type == "geometry":
                     # most of the time, geom.glsl is not required
+                    program_code["geometry_shader"] = None
                     continue
                 else:
                     raise FileNotFoundError(
                         f"{file_name} isn't found at the specified location."
                     )
 
-            with open(filepath, "r") as f:
-                refreshed_code = f.read()
-
-            # taken directly from 3b1b/manim
-            insertions = re.findall(
-                r"^#INSERT .*\.glsl$", refreshed_code, flags=re.MULTILINE
-            )
-
-            for line in insertions:
-                inserted_code = get_shader_code_from_file(
-                    os.path.join("inserts", line.replace("#INSERT ", ""))
-                )
-                refreshed_code = refreshed_code.replace(line, inserted_code)
+            program_code[f"{shader_type}_shader"] = self.preprocessor.resolve(filepath)
+        expanded_time = time.perf_counter()
 
-            self.shader_wrapper.program_code[f"{shader_type}_shader"] = refreshed_code
-            self.shader_wrapper.init_vertex_objects()
-            self.shader_wrapper.init_program()
-            self.shader_wrapper.refresh_id()
+        program = get_cached_program(wrapper.ctx, program_code)
+        release_cached_program(wrapper.ctx, wrapper.program)
+        self.refresh_timings = {
+            "stages": changed_stages,
+            "expand": expanded_time - start_time,
+            "compile": time.perf_counter() - expanded_time,
+        }
+        wrapper.program_code = program_code
+        wrapper.program = program
+        wrapper.programs = [program]
+        wrapper.vert_format = moderngl.detect_format(program, wrapper.vert_attributes)
+        wrapper.init_vertex_objects()
+        wrapper.refresh_id()
+        self.note_changed_data()
+        return True
@@ -0,0 +1,203 @@
+import os
+import sys
+import time
+import subprocess as sp
+import numpy as np
+import moderngl
+from manimlib.logger import log
+from manimlib.extract_scene import manim_config
+from manimlib.utils.color import color_to_rgba
+from manimlib.constants import UL, DL, UR, DR, FRAME_WIDTH, FRAME_HEIGHT
+from custom.shader_cache import (
+    SHADER_STAGES,
+    get_cached_program,
+    release_cached_program,
+)
+from custom.shader_preprocessor import ShaderPreprocessor
+from custom.uniforms import UniformBlock
+from custom.tiled_rendering import get_tiles, render_tiles
+
+
+def get_offscreen_context(backend: str = None) -> moderngl.Context:
+    """
+    A standalone OpenGL context of the given moderngl backend. By default, EGL
+    on Linux, so that no display is needed, and the default context of the
+    platform elsewhere, or if EGL isn't available.
+    """
+    if backend is not None:
+        return moderngl.create_standalone_context(backend=backend)
+    if sys.platform.startswith("linux"):
+        try:
+            return moderngl.create_standalone_context(backend="egl")
+        except Exception as err:
+            log.debug("No EGL context (%s), using the default one", err)
+    return moderngl.create_standalone_context()
+
+
+class OffscreenShaderRenderer:
+    """
+    Renders the full-screen quad of a ShaderScene on its own, headless,
+    without going through the Scene, the camera or any mobject.
+
+    Frames are drawn in a standalone OpenGL context (see get_offscreen_context),
+    read into one preallocated buffer and streamed straight to ffmpeg.
+
+    With tile_size set, each frame is drawn in scissor tiles of that many
+    pixels, one after the other, and the time taken by every tile is kept.
+
+    Usage:
+        renderer = OffscreenShaderRenderer("black_hole")
+        renderer.render("black_hole.mp4", start_frame=0, end_frame=600)
+    """
+
+    def __init__(
+        self,
+        shader_folder: str,
+        resolution: tuple = None,
+        fps: float = None,
+        background_color: str = None,
+        uniforms: dict = None,
+        tile_size: int = None,
+        backend: str = None,
+        ctx: moderngl.Context = None,
+    ):
+        camera_config = manim_config.camera
+        self.resolution = tuple(resolution or camera_config.resolution)
+        self.fps = fps or camera_config.fps
+        self.background_rgba = color_to_rgba(
+            background_color or camera_config.background_color
+        )
+
+        self.ctx = ctx or get_offscreen_context(backend)
+        self.fbo = ctx.simple_framebuffer(self.resolution, components=4)
+        self.frame_buffer = bytearray(self.resolution[0] * self.resolution[1] * 4)
+
+        self.tiles = get_tiles(self.resolution, tile_size) if tile_size else []
+        # seconds per tile of the last frame, and summed over all the frames
+        self.tile_timings = np.zeros(len(self.tiles))
+        self.total_tile_timings = np.zeros(len(self.tiles))
+
+        self.init_program(shader_folder)
+        self.init_uniforms(uniforms or dict())
+
+    def init_program(self, shader_folder: str) -> None:
+        preprocessor = ShaderPreprocessor(include_dirs=[shader_folder])
+        program_code = dict()
+        for stage, file_name in SHADER_STAGES.items():
+            filepath = os.path.join(shader_folder, f"{file_name}.glsl")
+            code = preprocessor.resolve(filepath) if os.path.exists(filepath) else None
+            program_code[f"{stage}_shader"] = code
+
+        self.program = get_cached_program(self.ctx, program_code)
+
+        # same quad as ShaderMobject, covering the whole frame
+        quad = np.array([UL, DL, UR, DR], dtype=np.float32)
+        quad *= np.array([FRAME_WIDTH / 2, FRAME_HEIGHT / 2, 0], dtype=np.float32)
+        self.vbo = self.ctx.buffer(quad)
+        self.vao = self.ctx.vertex_array(
+            self.program,
+            [(self.vbo, "3f", "point")],
+            mode=moderngl.TRIANGLE_STRIP,
+        )
+
+    def init_uniforms(self, uniforms: dict) -> None:
+        block = self.uniform_block = UniformBlock()
+        # camera looking at the default frame, as emit_gl_Position expects
+        block.add("view", np.identity(4).flatten())
+        block.add("frame_rescale_factors", [2 / FRAME_WIDTH, 2 / FRAME_HEIGHT, 0])
+        block.add("is_fixed_in_frame", 0.0)
+        block.add("clip_plane", np.zeros(4))
+
+        for name, value in uniforms.items():
+            block.add(name, value)
+
+        block.add("iResolution", self.resolution)
+        block.add("iTime", 0.0)
+        block.add("iFrame", 0)
+        block.add("iMouse", np.zeros(2))
+
+    def render_frame(self, frame: int) -> bytearray:
+        self.uniform_block.set("iTime", frame / self.fps)
+        self.uniform_block.set("iFrame", frame)
+
+        self.fbo.use()
+        self.fbo.clear(*self.background_rgba)
+        self.uniform_block.push(self.program)
+        if self.tiles:
+            render_tiles(self.ctx, self.vao.render, self.tiles, self.tile_timings)
+            self.total_tile_timings += self.tile_timings
+        else:
+            self.vao.render()
+        self.fbo.read_into(self.frame_buffer, components=4)
+        return self.frame_buffer
+
+    def get_ffmpeg_command(self, file_path: str) -> list[str]:
+        width, height = self.resolution
+        file_writer_config = manim_config.file_writer
+        command = [
+            file_writer_config.ffmpeg_bin,
+            "-y",  # overwrite output file if it exists
+            "-f", "rawvideo",
+            "-s", f"{width}x{height}",  # size of one frame
+            "-pix_fmt", "rgba",
+            "-r", str(self.fps),  # frames per second
+            "-i", "-",  # The input comes from a pipe
+            "-vf", "vflip",
+            "-an",  # Tells ffmpeg not to expect any audio
+            "-loglevel", "error",
+        ]
+        if file_writer_config.video_codec:
+            command += ["-vcodec", file_writer_config.video_codec]
+        if file_writer_config.pixel_format:
+            command += ["-pix_fmt", file_writer_config.pixel_format]
+        return command + [file_path]
+
+    def render(self, file_path: str, start_frame: int = 0, end_frame: int = None) -> dict:
+        """
+        Renders the frames [start_frame, end_frame) into a movie at `file_path`,
+        and returns the number of frames, the time taken and the frames/sec
+        (and, when tiled, the mean and the worst seconds per tile).
+        """
+        if end_frame is None:
+            end_frame = start_frame + int(10 * self.fps)
+
+        self.total_tile_timings[:] = 0
+        writing_process = sp.Popen(self.get_ffmpeg_command(file_path), stdin=sp.PIPE)
+        start_time = time.perf_counter()
+        try:
+            for frame in range(start_frame, end_frame):
+                writing_process.stdin.write(self.render_frame(frame))
+        finally:
+            writing_process.stdin.close()
+            writing_process.wait()
+        elapsed = time.perf_counter() - start_time
+
+        n_frames = end_frame - start_frame
+        stats = dict(
+            n_frames=n_frames,
+            seconds=elapsed,
+            fps=n_frames / elapsed if elapsed > 0 else float("inf"),
+        )
+        log.info(
+            "Rendered %d frames offscreen to %s in %.2f s (%.1f frames/sec)",
+            n_frames, file_path, elapsed, stats["fps"],
+        )
+        if self.tiles and n_frames > 0:
+            mean_timings = self.total_tile_timings / n_frames
+            worst = int(mean_timings.argmax())
+            stats.update(
+                tile_seconds=float(mean_timings.mean()),
+                worst_tile=self.tiles[worst],
+                worst_tile_seconds=float(mean_timings[worst]),
+            )
+            log.info(
+                "%d tiles: %.2f ms per tile on average, %.2f ms at worst for %s",
+                len(self.tiles), 1000 * stats["tile_seconds"],
+                1000 * stats["worst_tile_seconds"], stats["worst_tile"],
+            )
+        return stats
+
+    def release(self) -> None:
+        for obj in (self.vao, self.vbo, self.fbo):
+            obj.release()
+        release_cached_program(self.ctx, self.program)
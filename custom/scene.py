@@ -1,7 +1,10 @@
 import os
 import numpy as np
+import moderngl
+from manimlib.logger import log
 from manimlib.extract_scene import manim_config
 from custom.objects import ShaderMobject
+from custom.offscreen import OffscreenShaderRenderer
 from manimlib.utils.file_ops import guarantee_existence
 from custom.constants import FRAG_TEMPLATE, VERT_TEMPLATE
 from manimlib.scene.interactive_scene import InteractiveScene
@@ -21,10 +24,21 @@ class ShaderScene(InteractiveScene):
     |-------- geom.glsl (optional)
 
     If shader_folder is None (default), then shader folder is set to the SceneName.
+
+    If offscreen_time_range = (start, end) is set, writing the scene to a movie
+    renders just the shader over that time range, headless, skipping construct.
+
+    If tile_size is set, every frame is drawn in scissor tiles of that many pixels,
+    which keeps each draw call bounded on heavy shaders at high resolutions.
+    While in refresh_and_hold, the shader is drawn at 1 / preview_scale of the
+    resolution and upsampled, to keep the editing loop responsive.
     """
 
     shader_folder = None
     shader_class = ShaderMobject
+    offscreen_time_range = None
+    tile_size = None
+    preview_scale = 2
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -42,6 +56,36 @@ class ShaderScene(InteractiveScene):
         # similar to Shadertoy
         self.init_uniforms()
 
+    def run(self) -> None:
+        if self.offscreen_time_range is not None and self.file_writer.write_to_movie:
+            self.render_offscreen(*self.offscreen_time_range)
+            return
+        super().run()
+
+    def render_offscreen(self, start_time: float, end_time: float, file_path: str = None) -> dict:
+        """
+        Renders the shader from `start_time` to `end_time` (in seconds) without the
+        mobject pipeline, and streams the frames to ffmpeg. iMouse stays at the origin,
+        and uniforms given by a dict in set_uniforms are kept as they are.
+        """
+        fps = self.camera.fps
+        renderer = OffscreenShaderRenderer(
+            self.shader_folder_path,
+            resolution=self.camera_config["resolution"],
+            fps=fps,
+            background_color=self.camera_config["background_color"],
+            uniforms=self.uniform_block.values,
+            tile_size=self.tile_size,
+        )
+        try:
+            return renderer.render(
+                str(file_path or self.file_writer.get_movie_file_path()),
+                start_frame=int(start_time * fps),
+                end_frame=int(end_time * fps),
+            )
+        finally:
+            renderer.release()
+
     def setup(self) -> None:
         super().setup()
         self.add(self.shader)
@@ -72,40 +116,74 @@ class ShaderScene(InteractiveScene):
 
     def init_shader(self) -> None:
         self._shader_initialised = True
-        self.shader = self.shader_class(shader_folder=self.shader_folder_path)
+        self.shader = self.shader_class(
+            shader_folder=self.shader_folder_path, tile_size=self.tile_size
+        )
 
     def init_uniforms(self) -> None:
-        resolution = manim_config.camera.resolution
-        resolution = np.array(resolution, dtype=np.int32)
+        self.uniform_block = self.shader.uniform_block
+        self.uniform_block.add("iResolution", self.camera_config["resolution"])
+        self.uniform_block.add("iTime", 0.0)
+        self.uniform_block.add("iFrame", 0)
+        self.uniform_block.add("iMouse", np.zeros(2))
 
-        scene_uniforms = lambda: {
-            "iTime": self.time,
-            "iResolution": resolution,
-            "iMouse": self.mouse_point.get_center()[:2],
-        }
+        self.shader.add_updater(lambda m: self.update_uniforms())
 
-        self.set_uniforms(scene_uniforms)
+    def update_uniforms(self) -> None:
+        # only values which actually changed are sent to the program
+        block = self.uniform_block
+        block.set("iTime", self.time)
+        block.set("iFrame", int(self.time * self.camera.fps))
+        block.set("iMouse", self.mouse_point.get_points()[0, :2])
 
     def set_uniforms(self, uniforms) -> None:
+        """
+        `uniforms` is either a dict of values, or a function returning
+        such a dict, which is then evaluated on every frame.
+        """
         if isinstance(uniforms, dict):
-            self.shader.set_uniforms(uniforms)
+            for name, value in uniforms.items():
+                self.uniform_block.set(name, value)
         else:
-            self.shader.f_always.set_uniforms(uniforms)
+            self.shader.add_updater(lambda m: self.set_uniforms(uniforms()))
 
     def refresh_shader(self) -> None:
         """
         In the embed mode, this can be called to refresh the code
         without any need to restart the Scene.
         """
-        self.shader.refresh()
+        if self.shader.refresh():
+            timings = self.shader.refresh_timings
+            log.info(
+                "Refreshed %s shader(s): expanded in %.2f ms, compiled in %.2f ms",
+                ", ".join(timings["stages"]),
+                1000 * timings["expand"],
+                1000 * timings["compile"],
+            )
 
     def refresh_and_hold(self) -> None:
         """
         Refresh the Scene in loop.
         To exit the loop, press <spacebar> when Window is focused.
+
+        While holding, the shader files are watched, and only
+        the stages which are edited get recompiled. The shader is
+        previewed at 1 / preview_scale of the resolution meanwhile.
         """
         self.refresh_shader()
+
+        def watch_files(m):
+            # a typo saved while editing shouldn't end the session
+            try:
+                m.refresh(force=False)
+            except moderngl.Error as err:
+                log.error("Keeping the last shader which compiled:\n%s", err)
+
+        self.shader.add_updater(watch_files)
+        self.shader.set_preview_scale(self.preview_scale)
         self.hold_loop()
+        self.shader.set_preview_scale(1)
+        self.shader.remove_updater(watch_files)
 
     def set_shader_folder(self, folder: str) -> None:
         # Is this really necessary?
@@ -0,0 +1,106 @@
+import os
+import time
+import weakref
+import hashlib
+import moderngl
+from custom.shader_preprocessor import ShaderPreprocessor, get_file_stat
+
+
+# shader type -> file name (without extension)
+SHADER_STAGES = {
+    "vertex": "vert",
+    "geometry": "geom",
+    "fragment": "frag",
+}
+
+# context -> content hashes of the stages -> [compiled program, number of users],
+# forgotten along with the context
+SHADER_PROGRAMS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_content_hash(code: str) -> str:
+    if code is None:
+        return None
+    return hashlib.sha1(code.encode()).hexdigest()
+
+
+def get_cached_program(
+    ctx: moderngl.Context, program_code: dict[str, str]
+) -> moderngl.Program:
+    """
+    Compiles a program only if this exact combination of stages isn't
+    already in use in this context. Every call should be matched by a call
+    to release_cached_program once the program isn't needed anymore.
+    """
+    programs = SHADER_PROGRAMS.setdefault(ctx, dict())
+    key = tuple(
+        get_content_hash(program_code.get(f"{stage}_shader"))
+        for stage in SHADER_STAGES
+    )
+    if key not in programs:
+        programs[key] = [ctx.program(**program_code), 0]
+    programs[key][1] += 1
+    return programs[key][0]
+
+
+def release_cached_program(ctx: moderngl.Context, program: moderngl.Program) -> None:
+    """
+    Releases `program` once nothing uses it anymore, so that editing a shader
+    over and over doesn't keep every version of it. Programs which didn't
+    come from get_cached_program are left alone.
+    """
+    programs = SHADER_PROGRAMS.get(ctx, dict())
+    for key, entry in programs.items():
+        if entry[0] is program:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del programs[key]
+                program.release()
+            return
+
+
+class ShaderFileWatcher:
+    """
+    Polls the modification times of frag.glsl, vert.glsl and geom.glsl
+    in a shader folder, and of every file they #INSERT, and reports which
+    stages changed since the last poll.
+
+    Every stage counts as changed on the first poll.
+    """
+
+    def __init__(
+        self,
+        shader_folder: str,
+        preprocessor: ShaderPreprocessor,
+        poll_interval: float = 0.1,
+    ):
+        self.shader_folder = shader_folder
+        self.preprocessor = preprocessor
+        self.poll_interval = poll_interval
+        self.last_poll_time = -float("inf")
+        self.file_stats: dict[str, tuple] = dict()
+
+    def get_filepath(self, stage: str) -> str:
+        return os.path.join(self.shader_folder, f"{SHADER_STAGES[stage]}.glsl")
+
+    def get_changed_stages(self, force: bool = False) -> list[str]:
+        now = time.monotonic()
+        if not force and now - self.last_poll_time < self.poll_interval:
+            return []
+        self.last_poll_time = now
+
+        # files depending on an edited insert
+        affected_files = self.preprocessor.poll_changes()
+
+        changed = []
+        for stage in SHADER_STAGES:
+            filepath = self.get_filepath(stage)
+            stat = get_file_stat(filepath)
+            if (
+                stage not in self.file_stats
+                or self.file_stats[stage] != stat
+                or os.path.abspath(filepath) in affected_files
+            ):
+                self.file_stats[stage] = stat
+                changed.append(stage)
+        return changed
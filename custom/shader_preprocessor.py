@@ -0,0 +1,132 @@
+import os
+import re
+import time
+from collections import defaultdict
+from manimlib.utils.directories import get_shader_dir
+
+
+INSERT_PATTERN = re.compile(r"^#INSERT (.*\.glsl)$", flags=re.MULTILINE)
+
+
+def get_file_stat(path: str) -> tuple:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ShaderPreprocessor:
+    """
+    Expands "#INSERT file.glsl" lines recursively.
+
+    An inserted file is looked up next to the file inserting it first,
+    then in `include_dirs`, and at last in the "inserts" folder of manimlib.
+
+    Every expanded file is memoized, and the graph of which file inserts
+    which is kept, so that when a file changes on disk, only the files
+    depending on it (directly or not) are expanded again.
+    """
+
+    def __init__(self, include_dirs: list[str] = ()):
+        self.include_dirs = [*include_dirs, os.path.join(get_shader_dir(), "inserts")]
+
+        self.expanded_code: dict[str, str] = dict()
+        self.file_stats: dict[str, tuple] = dict()
+        # file -> files it inserts, and file -> files inserting it
+        self.includes: dict[str, set[str]] = dict()
+        self.included_by: dict[str, set[str]] = defaultdict(set)
+        # file -> seconds spent on the last expansion (including its inserts)
+        self.timings: dict[str, float] = dict()
+
+    def find_include(self, name: str, including_dir: str) -> str:
+        for directory in (including_dir, *self.include_dirs):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return os.path.abspath(path)
+        raise FileNotFoundError(
+            f"#INSERT {name} isn't found in {', '.join([including_dir, *self.include_dirs])}."
+        )
+
+    def resolve(self, path: str, _stack: tuple = ()) -> str:
+        """
+        Returns the code of the file at `path` with all the inserts expanded.
+        """
+        path = os.path.abspath(path)
+        if path in self.expanded_code:
+            return self.expanded_code[path]
+        if path in _stack:
+            cycle = " -> ".join(map(os.path.basename, (*_stack, path)))
+            raise ValueError(f"Circular #INSERT: {cycle}")
+
+        start = time.perf_counter()
+        self.file_stats[path] = get_file_stat(path)
+        with open(path, "r") as f:
+            code = f.read()
+
+        # the pieces are joined once, instead of replacing every
+        # insert line in the whole string one after another
+        pieces = []
+        includes = set()
+        last_end = 0
+        for match in INSERT_PATTERN.finditer(code):
+            include_path = self.find_include(match.group(1), os.path.dirname(path))
+            pieces.append(code[last_end:match.start()])
+            pieces.append(self.resolve(include_path, (*_stack, path)))
+            includes.add(include_path)
+            last_end = match.end()
+        pieces.append(code[last_end:])
+
+        for old_include in self.includes.get(path, ()):
+            self.included_by[old_include].discard(path)
+        for include_path in includes:
+            self.included_by[include_path].add(path)
+        self.includes[path] = includes
+
+        self.expanded_code[path] = "".join(pieces)
+        self.timings[path] = time.perf_counter() - start
+        return self.expanded_code[path]
+
+    def get_dependents(self, paths) -> set[str]:
+        """
+        The given files, together with every file which inserts
+        any of them, directly or through other files.
+        """
+        dependents = set()
+        stack = [os.path.abspath(path) for path in paths]
+        while stack:
+            path = stack.pop()
+            if path not in dependents:
+                dependents.add(path)
+                stack.extend(self.included_by[path])
+        return dependents
+
+    def invalidate(self, paths) -> set[str]:
+        dependents = self.get_dependents(paths)
+        for path in dependents:
+            self.expanded_code.pop(path, None)
+        return dependents
+
+    def poll_changes(self) -> set[str]:
+        """
+        Checks every file seen so far for changes on disk, forgets the
+        expansions which depend on them, and returns all the affected files.
+        """
+        changed = []
+        for path, stat in self.file_stats.items():
+            new_stat = get_file_stat(path)
+            if new_stat != stat:
+                self.file_stats[path] = new_stat
+                changed.append(path)
+
+        if not changed:
+            return set()
+        return self.invalidate(changed)
+
+    def get_timing_report(self, paths=None) -> str:
+        paths = self.timings.keys() if paths is None else map(os.path.abspath, paths)
+        return "\n".join(
+            f"{os.path.basename(path)}: expanded in {1000 * self.timings[path]:.2f} ms"
+            for path in paths
+            if path in self.timings
+        )
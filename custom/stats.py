@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class RunningStats:
+    """
+    Streaming count, mean, variance, min and max of a sequence of values.
+
+    Every update is O(batch size) and the state is O(1), so an updater can
+    read the statistics of millions of values every frame for free.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values) -> "RunningStats":
+        values = np.asarray(values, dtype=float).ravel()
+        n = len(values)
+        if n == 0:
+            return self
+
+        # Chan et al. parallel update of mean and variance
+        batch_mean = values.mean()
+        batch_m2 = np.square(values - batch_mean).sum()
+        delta = batch_mean - self.mean
+        total = self.count + n
+
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta**2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def get_count(self) -> int:
+        return self.count
+
+    def get_mean(self, default: float = 0.0) -> float:
+        return self.mean if self.count else default
+
+    def get_variance(self, default: float = 0.0) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else default
+
+    def get_std(self, default: float = 0.0) -> float:
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else default
+
+    def get_min(self, default: float = 0.0) -> float:
+        return self.min if self.count else default
+
+    def get_max(self, default: float = 0.0) -> float:
+        return self.max if self.count else default
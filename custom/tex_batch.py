@@ -0,0 +1,83 @@
+import os
+import re
+import subprocess
+import tempfile
+from custom.tex_format import compile_with_format
+
+
+# every string is wrapped in one, and standalone turns each into its own page
+BATCH_ENVIRONMENT = "texbatchpage"
+
+BATCH_HEADER = "\n".join((
+    f"\\documentclass[preview, multi={BATCH_ENVIRONMENT}]{{standalone}}",
+    f"\\newenvironment{{{BATCH_ENVIRONMENT}}}{{}}{{}}",
+))
+
+
+def get_batch_body(contents: list[str]) -> str:
+    """
+    Everything from \\begin{document} on of a document holding every string
+    of `contents` on its own page, each laid out as get_full_tex of manimlib
+    would lay it out alone.
+    """
+    pages = [
+        f"\\begin{{{BATCH_ENVIRONMENT}}}\n{content}\n\\end{{{BATCH_ENVIRONMENT}}}"
+        for content in contents
+    ]
+    return "\n\n".join(("\\begin{document}", *pages, "\\end{document}")) + "\n"
+
+
+def compile_batch(
+    contents: list[str],
+    preamble: str = "",
+    compiler: str = "latex",
+    message: str = "",
+    use_format: bool = True,
+) -> list[str]:
+    """
+    Compiles every string of `contents` with a single run of `compiler` (from
+    the format of the preamble, see compile_with_format) and of dvisvgm,
+    and returns the svg of each one, in order.
+
+    Raises LatexError if the document doesn't compile, and ValueError if
+    the pages don't match the strings one to one.
+    """
+    if message:
+        print(message, end="\r")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dvi_path = compile_with_format(
+            get_batch_body(contents), preamble, compiler, temp_dir,
+            header=BATCH_HEADER,
+            use_format=use_format,
+        )
+
+        # one svg per page, named after the page number
+        subprocess.run(
+            [
+                "dvisvgm",
+                dvi_path,
+                "-n",  # no fonts
+                "-v", "0",  # quiet
+                "-p", "1-",  # every page
+                "-o", os.path.join(temp_dir, "page-%p.svg"),
+            ],
+            capture_output=True,
+        )
+        pages = sorted(
+            (int(match.group(1)), name)
+            for name in os.listdir(temp_dir)
+            if (match := re.fullmatch(r"page-(\d+)\.svg", name))
+        )
+        if len(pages) != len(contents):
+            raise ValueError(
+                f"Got {len(pages)} pages out of {len(contents)} Tex strings"
+            )
+        svgs = []
+        for _, name in pages:
+            with open(os.path.join(temp_dir, name), encoding="utf-8") as file:
+                svgs.append(file.read())
+
+    if message:
+        print(" " * len(message), end="\r")
+    return svgs
@@ -0,0 +1,576 @@
+import os
+import ast
+import sys
+import time
+import hashlib
+import tempfile
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import manimlib
+from manimlib.logger import log
+from manimlib.config import manim_config
+from manimlib.mobject.svg import tex_mobject
+from manimlib.utils import tex_file_writing
+from manimlib.utils.directories import get_cache_dir
+from manimlib.utils.file_ops import guarantee_existence
+from manimlib.utils.tex_file_writing import LatexError, get_full_tex
+from custom import tex_format
+from custom.tex_batch import compile_batch
+
+
+# changing it invalidates every cached svg
+TEX_CACHE_VERSION = "1"
+
+# mobjects whose string arguments are compiled by LaTeX
+TEX_CLASSES = ("Tex", "TexText", "Title")
+
+# compiles from the format of the preamble, without the disk cache of manimlib
+compile_full_tex = tex_format.full_tex_to_svg
+
+
+class TexCache:
+    """
+    Stores the svgs compiled by LaTeX on disk, one file per document, named by
+    a hash of the whole document (the string, wrapped in the preamble of the
+    template, fonts included) and of the compiler. Unlike the cache of manimlib,
+    the key doesn't depend on the message printed while compiling, so the same
+    string is never compiled twice, whatever mobject and scene it comes from.
+
+    The size of the directory is kept as a running total, and once it grows
+    beyond `max_size` bytes, the least recently used svgs are deleted until
+    it's down to `evict_fraction` of it.
+
+    With `use_format`, strings are compiled from the format of the preamble
+    (see compile_with_format), and their svgs are stored apart from the others.
+
+    With `prewarm_on_miss`, the first miss of a render compiles every Tex string
+    found in the scenes being rendered at once (see prewarm_tex_cache), instead
+    of running LaTeX again for each new string.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = None,
+        max_size: int = 1024**3,
+        evict_fraction: float = 0.9,
+        prewarm_on_miss: bool = False,
+        use_format: bool = False,
+    ):
+        self.cache_dir = guarantee_existence(
+            cache_dir or os.path.join(get_cache_dir(), "tex")
+        )
+        self.max_size = max_size
+        self.evict_fraction = evict_fraction
+        self.prewarm_on_miss = prewarm_on_miss
+        self.use_format = use_format
+        # bytes in the directory, counted on the first put
+        self.size = None
+        self.size_lock = threading.Lock()
+        # whether batches give the same svgs as single runs, by preamble and compiler
+        self.batch_checks = dict()
+        self.batch_lock = threading.Lock()
+
+    def get_key(self, full_tex: str, compiler: str) -> str:
+        hasher = hashlib.sha256()
+        format_part = "format" if self.use_format else ""
+        for part in (TEX_CACHE_VERSION, compiler, format_part, full_tex):
+            hasher.update(part.encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()[:32]
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.svg")
+
+    def contains(self, full_tex: str, compiler: str) -> bool:
+        return os.path.exists(self.get_path(self.get_key(full_tex, compiler)))
+
+    def get(self, full_tex: str, compiler: str) -> str:
+        """
+        The cached svg of a document, or None if it was never compiled.
+        """
+        path = self.get_path(self.get_key(full_tex, compiler))
+        try:
+            with open(path, encoding="utf-8") as file:
+                svg = file.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return svg
+
+    def put(self, full_tex: str, compiler: str, svg: str) -> None:
+        path = self.get_path(self.get_key(full_tex, compiler))
+        data = svg.encode("utf-8")
+        # written to a temporary file of its own first, so that parallel
+        # compilations and interrupted renders never leave a half-written svg
+        fd, temp_path = tempfile.mkstemp(suffix=".part", dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+
+        with self.size_lock:
+            size = self.get_size()
+            size -= get_file_size(path)
+            os.replace(temp_path, path)
+            self.size = size + len(data)
+            if self.size > self.max_size:
+                self.evict()
+
+    def full_tex_to_svg(self, full_tex: str, compiler: str = "latex", message: str = "") -> str:
+        """
+        Same as full_tex_to_svg of manimlib, but only runs LaTeX on a miss.
+        """
+        svg = self.get(full_tex, compiler)
+        if svg is None and self.prewarm_on_miss:
+            self.prewarm_on_miss = False
+            self.prewarm_run()
+            svg = self.get(full_tex, compiler)
+        if svg is None:
+            svg = self.compile(full_tex, compiler, message)
+        return svg
+
+    def compile(self, full_tex: str, compiler: str, message: str = "") -> str:
+        svg = compile_full_tex(full_tex, compiler, message, use_format=self.use_format)
+        # dvisvgm prints nothing when it fails, don't remember that
+        if svg:
+            self.put(full_tex, compiler, svg)
+        return svg
+
+    def prewarm_run(self) -> None:
+        """
+        Compiles the Tex strings of the scenes given to manimgl on the command line.
+        """
+        file_name = manim_config.run.file_name
+        if not file_name or not os.path.exists(file_name):
+            return
+        try:
+            prewarm_tex_cache(file_name, manim_config.run.scene_names, cache=self)
+        except Exception as err:
+            log.warning("Couldn't prewarm the Tex cache: %s", err)
+
+    def compile_sources(
+        self,
+        sources: list[tuple[str, str, str]],
+        n_workers: int = 1,
+        batch: bool = True,
+    ) -> int:
+        """
+        Compiles the (latex, preamble, compiler) of `sources` which aren't cached.
+        Strings sharing a preamble and a compiler are split into at most
+        `n_workers` batches, each compiled by a single LaTeX run, which run
+        in parallel (or each string on its own, if `batch` is False).
+
+        Returns the number of strings which failed to compile.
+        """
+        groups = dict()
+        for latex, preamble, compiler in sources:
+            if not self.contains(get_full_tex(latex, preamble), compiler):
+                groups.setdefault((preamble, compiler), []).append(latex)
+
+        chunks = []
+        for (preamble, compiler), contents in groups.items():
+            size = -(-len(contents) // n_workers) if batch else 1
+            chunks.extend(
+                (contents[i:i + size], preamble, compiler)
+                for i in range(0, len(contents), size)
+            )
+
+        # the work is done by the latex processes, threads are enough
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            return sum(executor.map(lambda chunk: self.compile_chunk(*chunk), chunks))
+
+    def compile_chunk(self, contents: list[str], preamble: str, compiler: str) -> int:
+        """
+        Compiles `contents` as one document, or one by one if that fails.
+        Returns the number of strings which failed to compile.
+        """
+        if len(contents) > 1 and self.check_batch(contents[0], preamble, compiler):
+            try:
+                svgs = compile_batch(
+                    contents, preamble, compiler, use_format=self.use_format
+                )
+            except (LatexError, ValueError) as err:
+                log.warning(
+                    "Batch of %d Tex strings failed, compiling them one by one: %s",
+                    len(contents), str(err).strip(),
+                )
+            else:
+                for latex, svg in zip(contents, svgs):
+                    self.put(get_full_tex(latex, preamble), compiler, svg)
+                return 0
+
+        n_failed = 0
+        for latex in contents:
+            try:
+                n_failed += not self.compile(get_full_tex(latex, preamble), compiler)
+            except LatexError as err:
+                log.error("LaTeX failed on\n%s\n%s", latex, str(err).strip())
+                n_failed += 1
+        return n_failed
+
+    def check_batch(self, latex: str, preamble: str, compiler: str) -> bool:
+        """
+        Whether a batch gives the same svgs as compiling each string on its own,
+        with this preamble and compiler. Checked once, on `latex`, the first
+        time it's asked; if they differ, the strings are compiled one by one.
+        """
+        with self.batch_lock:
+            key = (preamble, compiler)
+            if key not in self.batch_checks:
+                try:
+                    svg = self.compile(get_full_tex(latex, preamble), compiler)
+                    # two pages, so that the check also covers splitting them
+                    svgs = compile_batch(
+                        [latex, latex], preamble, compiler, use_format=self.use_format
+                    )
+                except (LatexError, ValueError):
+                    # can't tell from this string, check with the next one
+                    return False
+                self.batch_checks[key] = bool(svg) and svgs == [svg, svg]
+                if not self.batch_checks[key]:
+                    log.warning(
+                        "Batched Tex strings don't give the same svgs as single "
+                        "ones with this preamble, compiling them one by one"
+                    )
+            return self.batch_checks[key]
+
+    def get_cached_files(self) -> list[str]:
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".svg")
+        ]
+
+    def get_size(self) -> int:
+        if self.size is None:
+            self.size = sum(map(get_file_size, self.get_cached_files()))
+        return self.size
+
+    def evict(self) -> None:
+        """
+        Deletes least recently used svgs until the directory is down
+        to evict_fraction of max_size.
+        """
+        stats = []
+        for path in self.get_cached_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, path))
+        stats.sort()
+
+        size = sum(stat[1] for stat in stats)
+        for _, file_size, path in stats:
+            if size <= self.evict_fraction * self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self.size = size
+
+    def clear(self) -> None:
+        with self.size_lock:
+            for path in self.get_cached_files():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.size = 0
+
+
+def get_file_size(path: str) -> int:
+    # 0 for files which don't exist (anymore)
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+_tex_cache: TexCache = None
+
+
+def install_tex_cache(cache: TexCache = None) -> TexCache:
+    """
+    Routes every LaTeX compilation of manimlib (Tex, TexText and everything
+    built on them) through `cache`, from then on. Nothing is routed through it
+    unless a scene file (or a script) calls this.
+    """
+    global _tex_cache
+    _tex_cache = cache or TexCache()
+    tex_file_writing.full_tex_to_svg = _tex_cache.full_tex_to_svg
+    tex_file_writing.latex_to_svg.cache_clear()
+    return _tex_cache
+
+
+def get_tex_cache() -> TexCache:
+    # the installed cache, or one on the same directory if there's none
+    return _tex_cache or TexCache()
+
+
+class TexSource(Exception):
+    # raised instead of compiling, carrying what would have been compiled
+    def __init__(self, latex: str, template: str = "", additional_preamble: str = "", **kwargs):
+        self.latex = latex
+        self.template = template
+        self.additional_preamble = additional_preamble
+
+
+def raise_tex_source(*args, **kwargs):
+    raise TexSource(*args, **kwargs)
+
+
+def get_tex_source(class_name: str, *args, **kwargs) -> tuple[str, str, str]:
+    """
+    The latex, preamble and compiler that `class_name(*args, **kwargs)`
+    (e.g. "Tex") would compile, without compiling it.
+    """
+    latex_to_svg = tex_mobject.latex_to_svg
+    tex_mobject.latex_to_svg = raise_tex_source
+    try:
+        getattr(manimlib, class_name)(*args, **kwargs)
+    except TexSource as source:
+        compiler, preamble = tex_file_writing.get_tex_config(source.template)
+        preamble = "\n".join([preamble, source.additional_preamble])
+        return source.latex, preamble, compiler
+    finally:
+        tex_mobject.latex_to_svg = latex_to_svg
+    raise ValueError(f"{class_name} didn't compile any LaTeX")
+
+
+def get_tex_document(class_name: str, *args, **kwargs) -> tuple[str, str]:
+    """
+    The full LaTeX document and the compiler of get_tex_source.
+    """
+    latex, preamble, compiler = get_tex_source(class_name, *args, **kwargs)
+    return get_full_tex(latex, preamble), compiler
+
+
+def get_call_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def evaluate_literal(node: ast.expr, env: dict):
+    """
+    Value of an expression made of literals, f-strings of them and the names
+    bound in `env`. Raises ValueError for anything else.
+    """
+    if isinstance(node, ast.Name):
+        if node.id not in env:
+            raise ValueError(f"Unknown name {node.id}")
+        return env[node.id]
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                spec = value.format_spec
+                spec = "" if spec is None else evaluate_literal(spec, env)
+                item = evaluate_literal(value.value, env)
+                if value.conversion != -1:
+                    item = {115: str, 114: repr, 97: ascii}[value.conversion](item)
+                parts.append(format(item, spec))
+            else:
+                parts.append(value.value)
+        return "".join(parts)
+    if isinstance(node, ast.Tuple):
+        return tuple(evaluate_literal(elt, env) for elt in node.elts)
+    if isinstance(node, ast.List):
+        return [evaluate_literal(elt, env) for elt in node.elts]
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        return {
+            evaluate_literal(key, env): evaluate_literal(value, env)
+            for key, value in zip(node.keys, node.values)
+        }
+    if (
+        isinstance(node, ast.Call)
+        and get_call_name(node.func) == "range"
+        and not node.keywords
+    ):
+        return range(*(evaluate_literal(arg, env) for arg in node.args))
+    return ast.literal_eval(node)
+
+
+def bind_loop(target: ast.expr, iterable: ast.expr, env: dict) -> list[dict]:
+    """
+    One environment per iteration of `for target in iterable` when the iterable
+    is known, or just `env` (leaving the target unknown) when it isn't.
+    """
+    try:
+        values = list(evaluate_literal(iterable, env))
+    except (ValueError, TypeError, SyntaxError):
+        return [env]
+
+    envs = []
+    for value in values:
+        if isinstance(target, ast.Name):
+            envs.append(dict(env, **{target.id: value}))
+        elif isinstance(target, ast.Tuple) and all(
+            isinstance(elt, ast.Name) for elt in target.elts
+        ):
+            envs.append(dict(env, **{elt.id: v for elt, v in zip(target.elts, value)}))
+        else:
+            return [env]
+    return envs
+
+
+def get_scene_nodes(tree: ast.Module, scene_names: list[str]) -> list[ast.stmt]:
+    """
+    The top level statements of a module which the scenes `scene_names` use:
+    everything but the classes of the other scenes (those deriving from
+    a class named *Scene), the classes they derive from being kept.
+    """
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+
+    def get_lineage(name: str) -> set[str]:
+        # the class and every class it derives from
+        names = {name}
+        for base in classes[name].bases:
+            base_name = get_call_name(base)
+            names.add(base_name)
+            if base_name in classes and base_name != name:
+                names |= get_lineage(base_name)
+        return names
+
+    needed = set()
+    for name in scene_names:
+        if name in classes:
+            needed |= get_lineage(name)
+    return [
+        node
+        for node in tree.body
+        if not isinstance(node, ast.ClassDef)
+        or node.name in needed
+        or not any(str(name).endswith("Scene") for name in get_lineage(node.name))
+    ]
+
+
+def find_tex_calls(
+    source: str,
+    class_names: tuple = TEX_CLASSES,
+    scene_names: list[str] = None,
+) -> tuple[list, int]:
+    """
+    Statically finds the calls to `class_names` in python source whose
+    arguments are all literals, including f-strings over the variables of
+    loops and comprehensions on literals, e.g. Tex(f"n = {i}") for i in range(3).
+    If `scene_names` are given, the other scenes of the source are left out.
+
+    Returns the distinct (class name, args, kwargs) and the number of calls
+    which couldn't be resolved.
+    """
+    calls = dict()
+    n_skipped = 0
+
+    def visit(node: ast.AST, envs: list[dict]):
+        nonlocal n_skipped
+        if isinstance(node, (ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)):
+            for gen in node.generators:
+                envs = [
+                    new_env
+                    for env in envs
+                    for new_env in bind_loop(gen.target, gen.iter, env)
+                ]
+        elif isinstance(node, ast.For):
+            visit(node.iter, envs)
+            envs = [
+                new_env
+                for env in envs
+                for new_env in bind_loop(node.target, node.iter, env)
+            ]
+            for child in itertools.chain(node.body, node.orelse):
+                visit(child, envs)
+            return
+
+        name = isinstance(node, ast.Call) and get_call_name(node.func)
+        if name in class_names:
+            # **kwargs can't be known
+            if any(keyword.arg is None for keyword in node.keywords):
+                envs, n_skipped = [], n_skipped + len(envs)
+            for env in envs:
+                try:
+                    args = tuple(evaluate_literal(arg, env) for arg in node.args)
+                    kwargs = {
+                        keyword.arg: evaluate_literal(keyword.value, env)
+                        for keyword in node.keywords
+                    }
+                except (ValueError, TypeError, SyntaxError):
+                    n_skipped += 1
+                    continue
+                calls[repr((name, args, sorted(kwargs.items())))] = (name, args, kwargs)
+
+        for child in ast.iter_child_nodes(node):
+            visit(child, envs)
+
+    tree = ast.parse(source)
+    for node in get_scene_nodes(tree, scene_names) if scene_names else [tree]:
+        visit(node, [dict()])
+    return list(calls.values()), n_skipped
+
+
+def prewarm_tex_cache(
+    file_path: str,
+    scene_names: list[str] = None,
+    n_workers: int = None,
+    cache: TexCache = None,
+    batch: bool = True,
+) -> dict:
+    """
+    Compiles, before rendering, every Tex, TexText and Title with literal
+    arguments (see find_tex_calls) of a file, or of some of its scenes,
+    which isn't cached yet. They're compiled as `n_workers` documents
+    of many pages, one LaTeX run each (see TexCache.compile_sources).
+
+    Returns the number of distinct strings found, of those already cached,
+    compiled and failed, and of the calls which couldn't be resolved.
+    """
+    cache = cache or get_tex_cache()
+    n_workers = n_workers or os.cpu_count() or 1
+    with open(file_path, encoding="utf-8") as file:
+        calls, n_skipped = find_tex_calls(file.read(), scene_names=scene_names)
+
+    sources = dict()
+    for name, args, kwargs in calls:
+        try:
+            source = get_tex_source(name, *args, **kwargs)
+        except Exception as err:
+            log.debug("Skipping %s%s: %s", name, args, err)
+            n_skipped += 1
+            continue
+        latex, preamble, compiler = source
+        sources[cache.get_key(get_full_tex(latex, preamble), compiler)] = source
+    n_misses = sum(
+        not cache.contains(get_full_tex(latex, preamble), compiler)
+        for latex, preamble, compiler in sources.values()
+    )
+
+    log.info(
+        "Compiling %d of %d Tex strings of %s",
+        n_misses, len(sources), " ".join([file_path, *(scene_names or [])]),
+    )
+    start = time.perf_counter()
+    n_failed = cache.compile_sources(list(sources.values()), n_workers, batch)
+
+    result = dict(
+        found=len(sources),
+        cached=len(sources) - n_misses,
+        compiled=n_misses - n_failed,
+        failed=n_failed,
+        skipped=n_skipped,
+    )
+    log.info(
+        "Prewarmed %s in %.1f s: %s",
+        file_path, time.perf_counter() - start,
+        ", ".join(f"{count} {name}" for name, count in result.items()),
+    )
+    return result
+
+
+if __name__ == "__main__":
+    # python -m custom.tex_cache _2024/probability_puzzle.py [SceneName ...]
+    # run from the root of the repo, so that custom_config.yml picks the template
+    prewarm_tex_cache(sys.argv[1], sys.argv[2:])
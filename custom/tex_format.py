@@ -0,0 +1,388 @@
+import os
+import re
+import time
+import hashlib
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+from manimlib.logger import log
+from manimlib.utils.directories import get_cache_dir
+from manimlib.utils.file_ops import guarantee_existence
+from manimlib.utils.tex_file_writing import LatexError, get_full_tex
+
+
+DOCUMENT_CLASS = "\\documentclass[preview]{standalone}"
+
+DVI_EXTENSIONS = {
+    "latex": ".dvi",
+    "xelatex": ".xdv",
+}
+
+# XeTeX can't dump the fonts it loaded into a format, so the preamble is
+# only dumped up to the first of these lines, the rest being read by every
+# run after the format
+DEFERRED_PATTERN = re.compile(
+    r"\\(set\w*font|new\w*font\w*|setCJK\w*|xeCJKsetup|defaultfontfeatures)\b"
+    r"|\\usepackage(\[[^\]]*\])?\{(ctex|xeCJK)\}"
+)
+
+# Tex strings of the scenes, for benchmark_tex_format
+BENCHMARK_STRINGS = [
+    "=",
+    "n = 1",
+    "g_A",
+    r"g(r) = -\frac{GM}{r^2}",
+    r"m' = \frac{M}{\frac{4}{3}\pi R^3} \cdot \frac{4}{3}\pi r^3",
+    r"\ddot{x} + kx + \gamma \dot{x} + \beta x^3 = F_0\cos{\omega t}",
+    r"P(A|B) = \frac{P(A\cap B)}{P(B)}",
+    r"\text{Probability of $A$ given $B$}",
+]
+
+
+def get_format_dir() -> str:
+    return str(guarantee_existence(os.path.join(get_cache_dir(), "tex_formats")))
+
+
+def split_preamble(preamble: str, compiler: str) -> tuple[str, str]:
+    """
+    The part of the preamble which goes into the format, and the part which
+    has to be read by every run: with xelatex, everything from the first line
+    loading fonts on, so that the packages are still loaded in their order.
+    """
+    if compiler != "xelatex":
+        return preamble, ""
+    lines = preamble.splitlines()
+    for index, line in enumerate(lines):
+        if DEFERRED_PATTERN.search(line):
+            return "\n".join(lines[:index]), "\n".join(lines[index:])
+    return preamble, ""
+
+
+@lru_cache
+def get_compiler_version(compiler: str) -> str:
+    # a format only loads in the TeX it was dumped by
+    try:
+        process = subprocess.run([compiler, "--version"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return ""
+    return process.stdout.split("\n", 1)[0]
+
+
+def get_format_name(header: str, dumped: str, compiler: str) -> str:
+    hasher = hashlib.sha256()
+    for part in (get_compiler_version(compiler), compiler, header, dumped):
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    return f"manim-{compiler}-{hasher.hexdigest()[:16]}"
+
+
+def get_latex_error(log_path: str) -> str:
+    if not os.path.exists(log_path):
+        return ""
+    with open(log_path, encoding="utf-8", errors="replace") as file:
+        error_match = re.search(r"(?<=\n! ).*\n.*\n", file.read())
+    return error_match.group() if error_match else ""
+
+
+def run_latex(
+    tex: str,
+    compiler: str,
+    temp_dir: str,
+    format_name: str = None,
+) -> str:
+    """
+    Compiles the document `tex` in `temp_dir` with `compiler`, starting from
+    the format `format_name` of the format dir if given, and returns the path
+    of the dvi (or xdv) file. Raises LatexError if it fails.
+    """
+    if compiler not in DVI_EXTENSIONS:
+        raise NotImplementedError(f"Compiler '{compiler}' is not implemented")
+    tex_path = os.path.join(temp_dir, "working.tex")
+    with open(tex_path, "w", encoding="utf-8") as file:
+        file.write(tex)
+
+    command = [compiler]
+    env = None
+    if format_name is not None:
+        command.append(f"-fmt={format_name}")
+        # the trailing separator keeps the default search path
+        env = dict(os.environ, TEXFORMATS=get_format_dir() + os.pathsep)
+    command.extend([
+        "-no-pdf",
+        "-interaction=batchmode",
+        "-halt-on-error",
+        f"-output-directory={temp_dir}",
+        tex_path,
+    ])
+    process = subprocess.run(command, capture_output=True, text=True, env=env)
+    if process.returncode != 0:
+        error_str = get_latex_error(tex_path[:-4] + ".log")
+        raise LatexError(error_str or "LaTeX compilation failed")
+    return tex_path[:-4] + DVI_EXTENSIONS[compiler]
+
+
+def build_format(name: str, header: str, dumped: str, compiler: str) -> None:
+    """
+    Dumps the document class and the preamble into name.fmt in the format dir.
+    """
+    format_dir = get_format_dir()
+    # in the format dir, so that the format can be moved into place at once
+    with tempfile.TemporaryDirectory(dir=format_dir) as temp_dir:
+        tex_path = os.path.join(temp_dir, f"{name}.tex")
+        with open(tex_path, "w", encoding="utf-8") as file:
+            file.write("\n".join((header, dumped, "\\dump")) + "\n")
+        process = subprocess.run(
+            [
+                compiler,
+                "-ini",
+                f"-jobname={name}",
+                "-interaction=batchmode",
+                "-halt-on-error",
+                f"-output-directory={temp_dir}",
+                f"&{compiler}",
+                tex_path,
+            ],
+            capture_output=True,
+            text=True,
+        )
+        fmt_path = os.path.join(temp_dir, f"{name}.fmt")
+        if process.returncode != 0 or not os.path.exists(fmt_path):
+            error_str = get_latex_error(os.path.join(temp_dir, f"{name}.log"))
+            raise LatexError(error_str or "Dumping the format failed")
+        os.replace(fmt_path, os.path.join(format_dir, f"{name}.fmt"))
+
+
+# formats which failed to build, to compile a document, or to give the
+# same svgs as compiling without them
+BROKEN_FORMATS: set[str] = set()
+# formats which gave the same svgs, also marked by a file in the format dir
+VERIFIED_FORMATS: set[str] = set()
+# so that parallel compilations dump a format only once
+FORMAT_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_format(header: str, dumped: str, compiler: str) -> str:
+    """
+    Name of the format of a document class and preamble, which is dumped
+    the first time it's asked for, and again whenever any of them or the
+    version of the compiler changes. None if it can't be dumped.
+    """
+    name = get_format_name(header, dumped, compiler)
+    if os.path.exists(os.path.join(get_format_dir(), f"{name}.fmt")):
+        return name
+    log.info("Dumping the LaTeX preamble into the format %s", name)
+    start = time.perf_counter()
+    try:
+        build_format(name, header, dumped, compiler)
+    except (LatexError, OSError) as err:
+        log.warning("Couldn't dump the format %s: %s", name, str(err).strip())
+        BROKEN_FORMATS.add(name)
+        return None
+    log.info("Dumped %s in %.1f s", name, time.perf_counter() - start)
+    return name
+
+
+def get_verified_path(name: str) -> str:
+    return os.path.join(get_format_dir(), f"{name}.verified")
+
+
+def is_format_verified(name: str) -> bool:
+    if name in BROKEN_FORMATS:
+        return False
+    if name not in VERIFIED_FORMATS and os.path.exists(get_verified_path(name)):
+        VERIFIED_FORMATS.add(name)
+    return name in VERIFIED_FORMATS
+
+
+def set_format_verified(name: str, verified: bool) -> None:
+    if verified:
+        VERIFIED_FORMATS.add(name)
+        open(get_verified_path(name), "w").close()
+    else:
+        VERIFIED_FORMATS.discard(name)
+        BROKEN_FORMATS.add(name)
+        if os.path.exists(get_verified_path(name)):
+            os.remove(get_verified_path(name))
+
+
+def check_format(name: str, tex: str, full_tex: str, compiler: str) -> None:
+    """
+    Compiles the document `full_tex` both as usual and as `tex` from the format
+    `name`, and marks the format as verified if the svgs are the same, or as
+    broken if they aren't. Leaves it unchecked if the document doesn't compile.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            svg = dvi_to_svg(run_latex(full_tex, compiler, temp_dir))
+        except LatexError:
+            return
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            format_svg = dvi_to_svg(run_latex(tex, compiler, temp_dir, name))
+        except LatexError:
+            format_svg = None
+    if format_svg != svg:
+        log.warning("The format %s changes the svgs, compiling without it", name)
+    set_format_verified(name, format_svg == svg)
+
+
+def compile_with_format(
+    body: str,
+    preamble: str,
+    compiler: str,
+    temp_dir: str,
+    header: str = DOCUMENT_CLASS,
+    use_format: bool = True,
+) -> str:
+    """
+    Compiles a document made of `header`, `preamble` and the `body` (everything
+    from \\begin{document} on) in `temp_dir`, from the format of the header
+    and preamble. The first document compiled from a format checks that it
+    gives the same svg as without it (see check_format). If there's no format,
+    it isn't verified, or the document doesn't compile with it, it's compiled
+    the usual way. Returns the path of the dvi (or xdv) file.
+    """
+    dumped, deferred = split_preamble(preamble, compiler)
+    tex = "\n\n".join((deferred, body))
+    full_tex = "\n\n".join((header, preamble, body))
+    name = None
+    if use_format:
+        with FORMAT_LOCK:
+            name = get_format(header, dumped, compiler)
+            if name is not None and name not in BROKEN_FORMATS:
+                if not is_format_verified(name):
+                    check_format(name, tex, full_tex, compiler)
+    if name is None or not is_format_verified(name):
+        return run_latex(full_tex, compiler, temp_dir)
+    try:
+        return run_latex(tex, compiler, temp_dir, name)
+    except LatexError:
+        pass
+    dvi_path = run_latex(full_tex, compiler, temp_dir)
+    if name not in BROKEN_FORMATS:
+        # it only failed because of the format
+        log.warning("The format %s doesn't work, compiling without it", name)
+        set_format_verified(name, False)
+    return dvi_path
+
+
+def split_full_tex(full_tex: str) -> tuple[str, str]:
+    """
+    The content and the preamble of a document made by get_full_tex,
+    or None if it wasn't made by it.
+    """
+    head, sep, rest = full_tex.partition("\n\n\\begin{document}\n\n")
+    prefix = DOCUMENT_CLASS + "\n\n"
+    if not sep or not head.startswith(prefix):
+        return None
+    content = rest.removesuffix("\n\n\\end{document}\n")
+    preamble = head[len(prefix):]
+    if get_full_tex(content, preamble) != full_tex:
+        return None
+    return content, preamble
+
+
+def dvi_to_svg(dvi_path: str) -> str:
+    process = subprocess.run(
+        [
+            "dvisvgm",
+            dvi_path,
+            "-n",  # no fonts
+            "-v", "0",  # quiet
+            "--stdout",  # output to stdout instead of file
+        ],
+        capture_output=True,
+    )
+    return process.stdout.decode("utf-8")
+
+
+def full_tex_to_svg(
+    full_tex: str,
+    compiler: str = "latex",
+    message: str = "",
+    use_format: bool = True,
+) -> str:
+    """
+    Same as full_tex_to_svg of manimlib, but starting from the format of the
+    preamble (see compile_with_format).
+    """
+    parts = split_full_tex(full_tex) if use_format else None
+    if message:
+        print(message, end="\r")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if parts is not None:
+            content, preamble = parts
+            body = "\n\n".join(("\\begin{document}", content, "\\end{document}")) + "\n"
+            dvi_path = compile_with_format(body, preamble, compiler, temp_dir)
+        else:
+            dvi_path = run_latex(full_tex, compiler, temp_dir)
+        result = dvi_to_svg(dvi_path)
+
+    if message:
+        print(" " * len(message), end="\r")
+    return result
+
+
+def benchmark_tex_format(
+    strings: list[str] = None,
+    template: str = "",
+    n_repeats: int = 3,
+) -> dict:
+    """
+    Compiles every Tex string of `strings` with and without the format of the
+    preamble of `template` (the one of custom_config.yml by default), and logs
+    the mean time per string of each, along with the time to dump the format
+    (zero if it was already dumped) and the number of strings whose svgs differ.
+    The format is only used once verified, and stops being used if any differ.
+    """
+    from custom.tex_cache import get_tex_document
+
+    strings = strings or BENCHMARK_STRINGS
+    documents = [get_tex_document("Tex", string, template=template) for string in strings]
+    # the preamble of the documents, which Tex joins to its own
+    full_tex, compiler = documents[0]
+    preamble = split_full_tex(full_tex)[1]
+
+    start = time.perf_counter()
+    with FORMAT_LOCK:
+        name = get_format(DOCUMENT_CLASS, split_preamble(preamble, compiler)[0], compiler)
+    dump_time = time.perf_counter() - start
+
+    times = dict()
+    svgs = dict()
+    for use_format in (False, True):
+        start = time.perf_counter()
+        for _ in range(n_repeats):
+            svgs[use_format] = [
+                full_tex_to_svg(full_tex, compiler, use_format=use_format)
+                for full_tex, compiler in documents
+            ]
+        times[use_format] = (time.perf_counter() - start) / n_repeats / len(strings)
+
+    result = dict(
+        n_strings=len(strings),
+        dump_time=dump_time,
+        time_without_format=times[False],
+        time_with_format=times[True],
+        speedup=times[False] / times[True],
+        n_differences=sum(a != b for a, b in zip(svgs[False], svgs[True])),
+    )
+    if name is not None and result["n_differences"] > 0:
+        set_format_verified(name, False)
+    result["format_verified"] = name is not None and is_format_verified(name)
+    log.info(
+        "%s, %d strings: %.3f s per string without the format, %.3f s with it "
+        "(x%.1f), %.1f s to dump it, %d svgs differ, format %s",
+        compiler, len(strings), times[False], times[True], result["speedup"],
+        dump_time, result["n_differences"],
+        "verified" if result["format_verified"] else "not used",
+    )
+    return result
+
+
+if __name__ == "__main__":
+    # python -m custom.tex_format, from the root of the repo
+    benchmark_tex_format()
@@ -0,0 +1,151 @@
+import time
+import numpy as np
+import moderngl
+from custom.uniforms import UniformBlockShaderWrapper
+
+
+UPSAMPLE_VERT = """
+#version 330
+
+in vec2 corner;
+out vec2 uv;
+
+void main() {
+    uv = 0.5 * (corner + 1.0);
+    gl_Position = vec4(corner, 0.0, 1.0);
+}
+"""
+
+UPSAMPLE_FRAG = """
+#version 330
+
+uniform sampler2D image;
+in vec2 uv;
+out vec4 frag_color;
+
+void main() {
+    frag_color = texture(image, uv);
+}
+"""
+
+
+def get_tiles(size: tuple, tile_size: int) -> list[tuple]:
+    """
+    Splits a framebuffer of the given (width, height) into
+    (x, y, width, height) tiles, row by row from the bottom.
+    """
+    width, height = size
+    return [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in range(0, height, tile_size)
+        for x in range(0, width, tile_size)
+    ]
+
+
+def render_tiles(
+    ctx: moderngl.Context, render, tiles: list[tuple], timings: np.ndarray = None
+) -> None:
+    """
+    Calls `render()` once per tile with the scissor of the bound framebuffer
+    set to that tile, waiting for every tile to finish before the next one
+    is submitted, so that the driver never gets a whole 4K frame at once.
+
+    The seconds taken by each tile are written into `timings` if given.
+    """
+    fbo = ctx.fbo
+    for index, tile in enumerate(tiles):
+        start = time.perf_counter()
+        fbo.scissor = tile
+        render()
+        ctx.finish()
+        if timings is not None:
+            timings[index] = time.perf_counter() - start
+    fbo.scissor = None
+
+
+class PreviewUpsampler:
+    """
+    Renders into a framebuffer `scale` times smaller than the bound one,
+    and then stretches the result (linearly filtered) over the bound one.
+    """
+
+    def __init__(self, ctx: moderngl.Context, scale: int = 2):
+        self.ctx = ctx
+        self.scale = scale
+        self.fbo = None
+        self.texture = None
+
+        self.program = ctx.program(
+            vertex_shader=UPSAMPLE_VERT, fragment_shader=UPSAMPLE_FRAG
+        )
+        corners = np.array([[-1, -1], [1, -1], [-1, 1], [1, 1]], dtype=np.float32)
+        self.vbo = ctx.buffer(corners)
+        self.vao = ctx.vertex_array(
+            self.program, [(self.vbo, "2f", "corner")], mode=moderngl.TRIANGLE_STRIP
+        )
+
+    def get_fbo(self, size: tuple) -> moderngl.Framebuffer:
+        low_size = tuple(max(1, -(-side // self.scale)) for side in size)
+        if self.fbo is None or self.fbo.size != low_size:
+            self.release_fbo()
+            self.texture = self.ctx.texture(low_size, components=4)
+            self.texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+            self.fbo = self.ctx.framebuffer(color_attachments=[self.texture])
+        return self.fbo
+
+    def render(self, render) -> None:
+        target = self.ctx.fbo
+        low_fbo = self.get_fbo(target.size)
+        low_fbo.use()
+        low_fbo.clear(0.0, 0.0, 0.0, 0.0)
+        render()
+
+        target.use()
+        self.texture.use(location=0)
+        self.program["image"] = 0
+        self.vao.render()
+
+    def release_fbo(self) -> None:
+        if self.fbo is not None:
+            self.fbo.release()
+            self.texture.release()
+        self.fbo = None
+        self.texture = None
+
+    def release(self) -> None:
+        self.release_fbo()
+        for obj in (self.vao, self.vbo, self.program):
+            obj.release()
+
+
+class TiledShaderWrapper(UniformBlockShaderWrapper):
+    """
+    Draws the shader either tile by tile (if tile_size is set),
+    or at 1 / preview_scale of the resolution and upsampled
+    (if preview_scale > 1), or as usual.
+
+    After a tiled frame, `tile_timings` holds the seconds per tile,
+    in the order given by get_tiles.
+    """
+
+    def __init__(self, *args, tile_size: int = None, preview_scale: int = 1, **kwargs):
+        self.tile_size = tile_size
+        self.preview_scale = preview_scale
+        self.tile_timings = np.zeros(0)
+        self.upsampler = None
+        super().__init__(*args, **kwargs)
+
+    def render(self) -> None:
+        if self.preview_scale > 1:
+            if self.upsampler is None or self.upsampler.scale != self.preview_scale:
+                if self.upsampler is not None:
+                    self.upsampler.release()
+                self.upsampler = PreviewUpsampler(self.ctx, self.preview_scale)
+            self.upsampler.render(super().render)
+        elif self.tile_size:
+            tiles = get_tiles(self.ctx.fbo.size, self.tile_size)
+            if len(self.tile_timings) != len(tiles):
+                self.tile_timings = np.zeros(len(tiles))
+            render_tiles(self.ctx, super().render, tiles, self.tile_timings)
+        else:
+            super().render()
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from manimlib.extract_scene import manim_config
+from manimlib.utils.directories import get_cache_dir
+from manimlib.utils.file_ops import guarantee_existence
+
+
+class TrajectoryCache:
+    """
+    Stores precomputed particle trajectories on disk as .npy files of shape
+    (n_frames, n_points, len(axes)), so that re-rendering a scene with
+    deterministic dynamics doesn't have to simulate it again.
+
+    Each trajectory is keyed by a hash of the simulation parameters, the seed,
+    the frame rate and the initial points. Files are read back as memmaps,
+    so a frame is just a view into the file. Once the directory grows beyond
+    `max_size` bytes, the least recently used trajectories are deleted.
+
+    Trajectories left half-written by an interrupted render are deleted when
+    the cache is opened, once nothing has written to them for `part_max_age`
+    seconds (so that the ones other renders are writing are left alone).
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = None,
+        max_size: int = 20 * 1024**3,
+        dtype: np.dtype = np.float32,
+        part_max_age: float = 3600,
+    ):
+        self.cache_dir = guarantee_existence(
+            cache_dir or os.path.join(get_cache_dir(), "trajectories")
+        )
+        self.max_size = max_size
+        self.dtype = np.dtype(dtype)
+        self.remove_stale_parts(part_max_age)
+
+    def get_key(self, params: dict, initial_points: np.ndarray) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(params, sort_keys=True, default=str).encode())
+        hasher.update(self.dtype.str.encode())
+        hasher.update(np.ascontiguousarray(initial_points).tobytes())
+        return hasher.hexdigest()[:32]
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get_trajectory(
+        self,
+        params: dict,
+        initial_points: np.ndarray,
+        n_frames: int,
+        fps: float,
+        step_func,
+        axes: tuple = (0, 1, 2),
+    ) -> np.ndarray:
+        """
+        Returns a read-only memmap of shape (n_frames, n_points, len(axes)),
+        simulating and storing it first if it isn't cached yet.
+
+        `step_func(points, t, dt)` must advance the points in place by one frame.
+        `params` should contain everything (including the seed) that the
+        dynamics depend on.
+
+        Returns None if the trajectory alone would exceed the size limit,
+        in which case the caller should simulate live.
+        """
+        points = np.array(initial_points, dtype=np.float32)
+        params = dict(params, fps=fps, n_frames=n_frames, axes=list(axes))
+        path = self.get_path(self.get_key(params, points))
+
+        if os.path.exists(path):
+            os.utime(path)  # mark as recently used
+            return np.load(path, mmap_mode="r")
+
+        shape = (n_frames, len(points), len(axes))
+        if np.prod(shape) * self.dtype.itemsize > self.max_size:
+            return None
+
+        self.evict(extra_size=int(np.prod(shape)) * self.dtype.itemsize)
+
+        # write into a temporary file first, so that an interrupted render
+        # never leaves a half-written trajectory behind
+        temp_path = path[:-4] + ".part.npy"
+        trajectory = np.lib.format.open_memmap(
+            temp_path, mode="w+", dtype=self.dtype, shape=shape
+        )
+        dt = 1 / fps
+        axes = list(axes)
+        for frame in range(n_frames):
+            trajectory[frame] = points[:, axes]
+            step_func(points, frame * dt, dt)
+        trajectory.flush()
+        del trajectory
+        os.replace(temp_path, path)
+
+        return np.load(path, mmap_mode="r")
+
+    def get_size(self) -> int:
+        return sum(os.path.getsize(path) for path in self.get_cached_files())
+
+    def get_cached_files(self) -> list[str]:
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".npy") and not name.endswith(".part.npy")
+        ]
+
+    def evict(self, extra_size: int = 0) -> None:
+        """
+        Deletes least recently used trajectories until `extra_size` more bytes fit.
+        """
+        files = sorted(self.get_cached_files(), key=os.path.getmtime)
+        total_size = sum(map(os.path.getsize, files)) + extra_size
+        for path in files:
+            if total_size <= self.max_size:
+                break
+            total_size -= os.path.getsize(path)
+            os.remove(path)
+
+    def remove_stale_parts(self, max_age: float) -> None:
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".part.npy"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        for path in self.get_cached_files():
+            os.remove(path)
+
+
+def play_trajectory_frame(
+    mobject, trajectory: np.ndarray, frame: float, axes: tuple = (0, 1, 2)
+):
+    """
+    Copies one frame of a cached trajectory into the points of a DotCloud.
+    Frames past the end of the trajectory hold the last one.
+    """
+    index = min(max(int(round(frame)), 0), len(trajectory) - 1)
+    mobject.get_points()[:, list(axes)] = trajectory[index]
+    mobject.note_changed_data()
+    return mobject
+
+
+def attach_cached_trajectory(
+    mobject,
+    stepper,
+    params: dict,
+    duration: float,
+    get_time,
+    axes: tuple = (0, 1, 2),
+    cache: TrajectoryCache = None,
+    fps: float = None,
+):
+    """
+    Animates the points of a DotCloud with `stepper` (anything having
+    `step(points, t, dt)` and `step_mobject(mobject, t, dt)`), playing
+    the first `duration` seconds back from the trajectory cache. Past them,
+    the points are simulated live from the last cached frame (the coordinates
+    which aren't in `axes` must stay constant for that).
+
+    If the trajectory can't be cached, the points are simulated live instead.
+
+    `fps` should be the frame rate of the scene (self.camera.fps), which can
+    differ from the one of the config. It's the one of the config by default.
+    """
+    fps = fps or manim_config.camera.fps
+    cache = cache or TrajectoryCache()
+    trajectory = cache.get_trajectory(
+        params,
+        mobject.get_points(),
+        n_frames=int(duration * fps),
+        fps=fps,
+        step_func=stepper.step,
+        axes=axes,
+    )
+
+    if trajectory is None:
+        mobject.add_updater(lambda m, dt: stepper.step_mobject(m, get_time(), dt))
+        return mobject
+
+    last_frame = len(trajectory) - 1
+    # time of the state the points hold once they're simulated live
+    live_time = None
+
+    def update_points(m, dt):
+        nonlocal live_time
+        frame = get_time() * fps
+        if live_time is None:
+            if int(round(frame)) <= last_frame:
+                return play_trajectory_frame(m, trajectory, frame, axes)
+            play_trajectory_frame(m, trajectory, last_frame, axes)
+            live_time = last_frame / fps
+        stepper.step_mobject(m, live_time, dt)
+        live_time += dt
+        return m
+
+    mobject.add_updater(update_points)
+    return mobject
@@ -0,0 +1,108 @@
+import numpy as np
+import moderngl
+from manimlib.shader_wrapper import ShaderWrapper
+
+
+# last character of moderngl's Uniform.fmt -> numpy dtype
+UNIFORM_DTYPES = {
+    "f": np.float32,
+    "d": np.float64,
+    "i": np.int32,
+    "u": np.uint32,
+}
+
+
+class UniformBlock:
+    """
+    Preallocated storage for the uniforms of a shader program,
+    e.g. Shadertoy like iTime, iResolution, iMouse and iFrame.
+
+    Each uniform lives in its own small numpy array, which is written to the
+    program directly (no tuples or dicts are built), and only the uniforms
+    whose values changed since the last push are sent to the program.
+    """
+
+    def __init__(self):
+        self.values: dict[str, np.ndarray] = dict()
+        self.dirty: set[str] = set()
+        self.program = None
+        self.program_uniforms: dict[str, moderngl.Uniform] = dict()
+
+    def add(self, name: str, value=0.0) -> "UniformBlock":
+        self.values[name] = np.array(value, dtype=np.float64).reshape(-1)
+        self.dirty.add(name)
+        # the program has to look up the new uniform
+        self.program = None
+        return self
+
+    def set(self, name: str, value) -> "UniformBlock":
+        if name not in self.values:
+            return self.add(name, value)
+
+        storage = self.values[name]
+        if storage.size == 1:
+            if storage[0] == value:
+                return self
+            storage[0] = value
+        else:
+            if (storage == value).all():
+                return self
+            storage[:] = value
+        self.dirty.add(name)
+        return self
+
+    def get(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+    def bind(self, program: moderngl.Program) -> None:
+        """
+        Looks up the uniforms of the block used by the program and matches
+        the dtype of their storage with the one declared in the shader.
+        """
+        self.program = program
+        self.program_uniforms = dict()
+
+        for name, storage in self.values.items():
+            uniform = program.get(name, None)
+            if not isinstance(uniform, moderngl.Uniform):
+                continue
+
+            dtype = UNIFORM_DTYPES[uniform.fmt[-1]]
+            if storage.size != uniform.dimension * uniform.array_length:
+                raise ValueError(
+                    f"Uniform '{name}' has {storage.size} value(s), "
+                    f"but the shader declares it with format {uniform.fmt}."
+                )
+            if storage.dtype != dtype:
+                self.values[name] = storage.astype(dtype)
+            self.program_uniforms[name] = uniform
+
+    def push(self, program: moderngl.Program) -> None:
+        if program is not self.program:
+            self.bind(program)
+            names = self.program_uniforms.keys()
+        else:
+            names = self.dirty
+
+        for name in names:
+            uniform = self.program_uniforms.get(name)
+            if uniform is not None:
+                uniform.write(self.values[name])
+        self.dirty.clear()
+
+
+class UniformBlockShaderWrapper(ShaderWrapper):
+    """
+    ShaderWrapper which also pushes the changed values of a UniformBlock
+    whenever the program uniforms are updated.
+    """
+
+    def __init__(self, *args, uniform_block: UniformBlock, **kwargs):
+        self.uniform_block = uniform_block
+        super().__init__(*args, **kwargs)
+
+    def update_program_uniforms(self, camera_uniforms: dict) -> None:
+        super().update_program_uniforms(camera_uniforms)
+        for program in self.programs:
+            if program is not None:
+                self.uniform_block.push(program)
@@ -0,0 +1,165 @@
+import os
+import re
+import sys
+import time
+import inspect
+import itertools
+import traceback
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from manimlib.logger import log
+from manimlib.extract_scene import manim_config
+
+
+def get_variants(grid: dict) -> list[dict]:
+    """
+    Every combination of the values in `grid` (a dict from names to lists of
+    values), in a fixed order: the names sorted, the values as given.
+    """
+    names = sorted(grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(grid[name] for name in names))
+    ]
+
+
+def get_variant_name(scene_name: str, params: dict) -> str:
+    """
+    A file name which only depends on the scene and the parameters,
+    e.g. OscillatorVectorField_f0=2.5_omega=1.2
+    """
+    parts = [scene_name] + [f"{name}={params[name]}" for name in sorted(params)]
+    return re.sub(r"[^\w.=-]+", "", "_".join(parts))
+
+
+def render_variant(
+    file_path: str,
+    scene_name: str,
+    params: dict,
+    output_directory: str,
+    file_name: str,
+    camera_config: dict = None,
+    max_memory: int = None,
+) -> dict:
+    """
+    Renders one variant of a scene to a movie, in the current process, without
+    a window. `params` are set as class attributes of a subclass of the scene.
+
+    Returns the name of the variant, its parameters, the path of the movie,
+    the seconds taken, the number of frames and the frames/sec, and the
+    traceback if it failed.
+    """
+    if max_memory is not None:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, hard))
+
+    result = dict(name=file_name, params=params, error=None)
+    start = time.perf_counter()
+    try:
+        # scene files import manim_imports from the root of the repo
+        directory = os.path.dirname(os.path.abspath(file_path))
+        for path in (directory, os.path.dirname(directory)):
+            if path not in sys.path:
+                sys.path.append(path)
+
+        spec = importlib.util.spec_from_file_location(f"variant_{file_name}", file_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        scene_class = getattr(module, scene_name)
+        variant_class = type(scene_name, (scene_class,), dict(params))
+
+        scene = variant_class(
+            camera_config=camera_config or dict(),
+            file_writer_config=dict(
+                write_to_movie=True,
+                output_directory=output_directory,
+                file_name=file_name,
+                quiet=True,
+            ),
+        )
+        scene.run()
+        fps = scene.camera.fps
+        result.update(
+            path=str(scene.file_writer.get_movie_file_path()),
+            n_frames=int(round(scene.time * fps)),
+        )
+    except Exception:
+        result.update(path=None, n_frames=0, error=traceback.format_exc())
+
+    result["seconds"] = time.perf_counter() - start
+    result["fps"] = result["n_frames"] / result["seconds"]
+    return result
+
+
+def render_variants(
+    scene_class: type,
+    grid: dict,
+    output_directory: str = None,
+    n_workers: int = None,
+    max_memory: int = None,
+    camera_config: dict = None,
+) -> list[dict]:
+    """
+    Renders every combination of the parameters in `grid` (names of class
+    attributes of `scene_class` mapped to lists of values) headless, each in its
+    own worker process, at most `n_workers` at a time. Every process renders a
+    single variant and exits, so memory never piles up, and `max_memory` (in
+    bytes) caps the address space of each one.
+
+    Movies are named by get_variant_name, in `output_directory` (by default
+    a folder named after the scene in the output directory of manim).
+    Returns the results of render_variant, in the order of get_variants,
+    after logging a summary.
+
+    Usage:
+        render_variants(
+            OscillatorVectorField,
+            dict(f0=[1.5, 2.5], omega=[1.2, 2]),
+            camera_config=dict(resolution=(1280, 720)),
+        )
+    """
+    scene_name = scene_class.__name__
+    file_path = inspect.getfile(scene_class)
+    output_directory = output_directory or os.path.join(
+        manim_config.file_writer.output_directory, f"{scene_name}_variants"
+    )
+    n_workers = n_workers or os.cpu_count() or 1
+
+    variants = get_variants(grid)
+    names = [get_variant_name(scene_name, params) for params in variants]
+    log.info(
+        "Rendering %d variants of %s on %d processes", len(variants), scene_name, n_workers
+    )
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, max_tasks_per_child=1) as executor:
+        futures = [
+            executor.submit(
+                render_variant,
+                file_path, scene_name, params, output_directory, name,
+                camera_config, max_memory,
+            )
+            for params, name in zip(variants, names)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    log_summary(results, elapsed)
+    return results
+
+
+def log_summary(results: list[dict], elapsed: float) -> None:
+    width = max(len(result["name"]) for result in results)
+    lines = [f"{'variant':<{width}} {'seconds':>9} {'frames':>7} {'frames/sec':>11}"]
+    for result in results:
+        lines.append(
+            f"{result['name']:<{width}} {result['seconds']:>9.1f} "
+            f"{result['n_frames']:>7} {result['fps']:>11.1f}"
+            + ("  FAILED" if result["error"] else "")
+        )
+    log.info("Variants rendered in %.1f s\n%s", elapsed, "\n".join(lines))
+
+    for result in results:
+        if result["error"]:
+            log.error("%s failed:\n%s", result["name"], result["error"])
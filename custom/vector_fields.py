@@ -0,0 +1,186 @@
+import time
+import numpy as np
+from manimlib.mobject.vector_field import VectorField
+from manimlib.mobject.coordinate_systems import Axes, CoordinateSystem
+from manimlib.mobject.mobject_update_utils import always_redraw
+from manimlib.utils.bezier import inverse_interpolate
+from custom.integrators import ODESystem, DuffingSystem
+
+
+class ODEVectorField(VectorField):
+    """
+    The vector field of an ODESystem at time `get_time()`, as a single
+    mobject which stays in the scene and is updated in place on every frame.
+
+    The sample points, the points of the arrows, the base stroke widths and
+    the color map are set up once; a frame only evaluates the derivative of
+    the system on the samples (into a preallocated buffer) and rewrites the
+    tips, widths and colors of the arrows.
+
+    Only linear coordinate systems (Axes, NumberPlane, ThreeDAxes) are supported,
+    the outputs being mapped to the scene with one matrix product.
+    """
+
+    def __init__(
+        self,
+        system: ODESystem,
+        coordinate_system: CoordinateSystem,
+        get_time=None,
+        axes: tuple = (0, 1),
+        **kwargs,
+    ):
+        self.system = system
+        self.get_time = get_time or (lambda: 0.0)
+        self.axes = list(axes)
+        self.state = None
+
+        super().__init__(self.get_outputs, coordinate_system, **kwargs)
+        self.add_updater(lambda m: m.update_vectors())
+
+    def init_buffers(self) -> None:
+        coords = self.sample_coords
+        n_samples = len(coords)
+
+        self.state = np.zeros((n_samples, self.system.dim))
+        self.state[:, self.axes] = coords[:, : len(self.axes)]
+        self.outputs = np.zeros_like(self.state)
+        self.system.allocate(n_samples, self.state.dtype)
+
+        # outputs in the coordinate system -> vectors in the scene
+        cs = self.coordinate_system
+        origin = cs.get_origin()
+        self.basis = np.array([
+            cs.c2p(*unit) - origin for unit in np.identity(len(self.axes))
+        ])
+
+        self.out_vects = np.zeros((n_samples, 3))
+        self.norms = np.zeros((n_samples, 1))
+        self.scene_norms = np.zeros((n_samples, 1))
+        self.unit_vects = np.zeros((n_samples, 3))
+        self.drawn_norms = np.zeros((n_samples, 1))
+
+    def init_points(self):
+        super().init_points()
+        # the tails of the arrows never move
+        self.get_points()[0::8] = self.sample_points
+
+    def get_outputs(self, coords: np.ndarray = None) -> np.ndarray:
+        if self.state is None or len(self.state) != len(self.sample_coords):
+            self.init_buffers()
+        self.system.derivative(self.state, self.get_time(), self.outputs)
+        return self.outputs[:, self.axes]
+
+    def update_vectors(self):
+        outputs = self.get_outputs()
+        tip_width = self.tip_width_ratio * self.stroke_width
+        tip_len = self.tip_len_to_width * tip_width
+
+        norms = self.norms
+        np.sqrt((outputs * outputs).sum(1, keepdims=True), out=norms)
+
+        out_vects = self.out_vects
+        np.matmul(outputs, self.basis, out=out_vects)
+        scene_norms = self.scene_norms
+        np.sqrt((out_vects * out_vects).sum(1, keepdims=True), out=scene_norms)
+        unit_vects = self.unit_vects
+        unit_vects[:] = 0
+        np.true_divide(out_vects, scene_norms, out=unit_vects, where=(scene_norms > 0))
+
+        drawn_norms = self.drawn_norms
+        max_len = self.max_displayed_vect_len
+        if max_len < np.inf:
+            np.true_divide(scene_norms, max_len, out=drawn_norms)
+            np.tanh(drawn_norms, out=drawn_norms)
+            drawn_norms *= max_len
+        else:
+            drawn_norms[:] = scene_norms
+
+        # only the heads of the arrows change
+        points = self.get_points()
+        tails = points[0::8]
+        np.multiply(unit_vects, np.clip(drawn_norms - tip_len, 0, np.inf), out=points[2::8])
+        points[2::8] += tails
+        points[4::8] = points[2::8]
+        np.multiply(unit_vects, drawn_norms, out=points[6::8])
+        points[6::8] += tails
+        for i in (1, 3, 5):
+            points[i::8] = 0.5 * (points[i - 1::8] + points[i + 1::8])
+        points[7::8] = points[6:-1:8]
+
+        # per arrow, then spread over its 8 points
+        width_scalars = np.clip(drawn_norms[:, 0] / tip_len, 0, 1)
+        widths = self.get_stroke_widths()
+        width_arr = self.stroke_width * self.base_stroke_width_array
+        for i in range(8):
+            widths[i::8] = width_scalars[: len(widths[i::8])] * width_arr[i::8]
+
+        if self.color_map is not None:
+            # the number of points never changes, so stroke_rgba is
+            # written directly (get_stroke_colors would build hex strings)
+            low, high = self.magnitude_range
+            rgbs = self.color_map(inverse_interpolate(low, high, norms[:, 0]))[:, :3]
+            stroke_rgba = self.data["stroke_rgba"]
+            for i in range(8):
+                stroke_rgba[i::8, :3] = rgbs[: len(stroke_rgba[i::8])]
+
+        if self.norm_to_opacity_func is not None:
+            opacities = self.norm_to_opacity_func(norms[:, 0])
+            stroke_opacities = self.get_stroke_opacities()
+            for i in range(8):
+                stroke_opacities[i::8] = opacities[: len(stroke_opacities[i::8])]
+
+        self.note_changed_data()
+        return self
+
+
+def benchmark_vector_field(
+    width: float = 25,
+    height: float = 25 * 9 / 16,
+    n_frames: int = 60,
+    color_map=None,
+) -> dict:
+    """
+    Reports the seconds per frame of a Duffing vector field rebuilt with
+    always_redraw (a new Axes and VectorField every frame) vs. one ODEVectorField.
+    """
+    clock = [0.0]
+
+    def get_axes():
+        return Axes(
+            x_range=(-width / 2, width / 2, 1),
+            y_range=(-height / 2, height / 2, 1),
+        )
+
+    system = DuffingSystem(-1, 0.1, 0.25, 2.5, 2)
+
+    def func(coords):
+        state = np.zeros((len(coords), 3))
+        state[:, :2] = coords
+        system.allocate(len(coords), state.dtype)
+        return system.derivative(state, clock[0], np.zeros_like(state))[:, :2]
+
+    redrawn = always_redraw(lambda: VectorField(func, get_axes(), color_map=color_map))
+    persistent = ODEVectorField(
+        DuffingSystem(-1, 0.1, 0.25, 2.5, 2),
+        get_axes(),
+        get_time=lambda: clock[0],
+        color_map=color_map,
+    )
+
+    results = dict()
+    for name, mobject in [("always_redraw", redrawn), ("ODEVectorField", persistent)]:
+        start = time.perf_counter()
+        for frame in range(n_frames):
+            clock[0] = frame / 30
+            mobject.update()
+        results[name] = (time.perf_counter() - start) / n_frames
+
+    print(f"{'':>16} {'ms/frame':>10}")
+    for name, seconds in results.items():
+        print(f"{name:>16} {1000 * seconds:>10.2f}")
+    print(f"speedup: {results['always_redraw'] / results['ODEVectorField']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_vector_field()